@@ -0,0 +1,353 @@
+'''
+benchmark.py
+
+Measures how fast the simulation runs. Every engine is timed on a
+set of scenarios (how crowded the world is and which organisms
+live in it) over a range of population sizes, reporting ticks per
+second and the time spent in each phase of a tick. The time it takes
+to import the simulator modules is measured as well. The results
+are written as JSON and can be compared against a stored baseline,
+in which case the benchmark fails if anything got slower than the
+allowed threshold. It also fails if any import takes longer than
+the import time target.
+
+Run from the command line, for example:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --threshold .2
+'''
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import population
+import profiler
+import sim_core
+
+# organisms per unit of area and the share of each type
+scenarios = {
+	'sparse': {'density': .0005, 'mix': {'plant': .5, 'herbivore': .25, 'omnivore': .25}},
+	'crowded': {'density': .01, 'mix': {'plant': .5, 'herbivore': .25, 'omnivore': .25}},
+	'predator-heavy': {'density': .002, 'mix': {'plant': .2, 'herbivore': .2, 'omnivore': .3, 'carnivore': .3}},
+	'plant-saturated': {'density': .005, 'mix': {'plant': .85, 'herbivore': .1, 'omnivore': .05}},
+}
+
+defaultSizes = (50, 500, 5000, 100000)
+
+# the largest population each engine is run with by default
+engineLimits = {'object': 20000, 'population': None, 'organism.update': 5000, 'viewer': 2000}
+
+# the modules whose import time is measured and the most seconds
+# importing any of them may take
+importModules = ('sim_core', 'graphics', 'natural_selection')
+importTimeTarget = .25
+
+def timeImport(module, repeats = 5):
+	'''
+	Measures how long importing a module takes in a fresh Python
+	interpreter, so nothing is cached by an earlier import.
+
+	Parameters:
+		module: The name of the module.
+		repeats (optional): The number of interpreters started.
+
+	Return Value: The fastest of the measured times in seconds.
+	'''
+	code = 'import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)'.format(module)
+	directory = os.path.dirname(os.path.abspath(__file__))
+	times = []
+	for i in range(repeats):
+		completed = subprocess.run([sys.executable, '-c', code], cwd=directory, capture_output=True, text=True)
+		if completed.returncode != 0:
+			lines = completed.stderr.strip().splitlines()
+			raise RuntimeError(lines[-1] if lines else 'exit status {}'.format(completed.returncode))
+		times.append(float(completed.stdout))
+	return min(times)
+
+def timeImports(modules = importModules, repeats = 5):
+	'''
+	Measures the import time of each module (see timeImport).
+
+	Return Value:
+		A dictionary mapping each module to its import time in
+		seconds, or to an error message if it failed to import.
+	'''
+	imports = {}
+	for module in modules:
+		try:
+			imports[module] = timeImport(module, repeats)
+		except RuntimeError as error:
+			imports[module] = str(error)
+	return imports
+
+def checkImports(imports, target = importTimeTarget):
+	'''
+	Checks measured import times against the target.
+
+	Return Value:
+		A list of messages describing every module that failed to
+		import or took longer than target seconds.
+	'''
+	problems = []
+	for module, seconds in imports.items():
+		if isinstance(seconds, str):
+			problems.append('import {} failed: {}'.format(module, seconds))
+		elif seconds > target:
+			problems.append('import {}: {:.3f} s, target {:.3f}'.format(module, seconds, target))
+	return problems
+
+def buildSimulation(engine, scenario, size, seed):
+	'''
+	Creates a simulation filled with the organisms of a scenario.
+	sim_core.windowSize is set so that the world has the density
+	of the scenario.
+
+	Parameters:
+		engine: 'population' for a population.population, any other
+				engine for a sim_core.simulation.
+		scenario: The name of the scenario.
+		size: The number of organisms.
+		seed: The seed for the random number generator.
+
+	Return Value: The new simulation.
+	'''
+	settings = scenarios[scenario]
+	sim_core.configure(windowSize=math.sqrt(size / settings['density']) / 2)
+
+	if engine == 'population':
+		sim = population.population(capacity=size, seed=seed)
+		for organismType, share in settings['mix'].items():
+			sim.addRandom(organismType, round(size * share))
+	else:
+		random.seed(seed)
+		sim = sim_core.simulation()
+		for organismType, share in settings['mix'].items():
+			for i in range(round(size * share)):
+				sim.addOrganism(organismType)
+	return sim
+
+def timePhases(sim, ticks):
+	'''
+	Runs ticks of a simulation with a tickProfiler attached.
+
+	Return Value:
+		A dictionary mapping each phase name (see
+		sim_core.tickPhases) to the total number of seconds spent
+		in it.
+	'''
+	tickProfiler = profiler.tickProfiler()
+	sim.attachProfiler(tickProfiler)
+	try:
+		for i in range(ticks):
+			sim.update()
+	finally:
+		sim.detachProfiler()
+	return tickProfiler.phaseTotals
+
+def timeOrganismUpdates(sim, ticks):
+	'''
+	Runs ticks of a sim_core.simulation the way the original
+	simulation did, calling organism.update for one organism after
+	another.
+
+	Return Value: The number of seconds the ticks took.
+	'''
+	start = time.perf_counter()
+	for i in range(ticks):
+		sim.grid.rebuild(sim.organisms)
+		for organism in [organism for organism in sim.organisms if organism.getType() != 'plant']:
+			if organism.isAlive():
+				organism.update(sim.organisms, sim.grid)
+		sim.spawnPlants()
+		sim.render(sim.endTick())
+	return time.perf_counter() - start
+
+def timeViewer(sim, ticks):
+	'''
+	Runs ticks of a sim_core.simulation through
+	naturalSelectionSim.update with a window attached.
+
+	Return Value:
+		A tuple (phases, seconds) of the per-phase totals of a
+		phase-timed run and the seconds naturalSelectionSim.update
+		took to run the remaining ticks.
+	'''
+	import natural_selection
+	viewer = natural_selection.naturalSelectionSim(sim)
+	try:
+		viewer.drawSimulation(sim)
+		phases = timePhases(sim, ticks)
+
+		previous = (natural_selection.tickTime, natural_selection.timeBudget)
+		natural_selection.tickTime = None
+		natural_selection.timeBudget = None
+		try:
+			start = time.perf_counter()
+			viewer.update(ticks)
+			seconds = time.perf_counter() - start
+		finally:
+			natural_selection.tickTime, natural_selection.timeBudget = previous
+	finally:
+		viewer.close()
+	return phases, seconds
+
+def runCase(engine, scenario, size, ticks, seed = 0):
+	'''
+	Benchmarks one engine on one scenario and population size.
+	The viewer engine is recorded as skipped if there is no
+	display to open its window on; any other error is raised.
+
+	Return Value: A result dictionary.
+	'''
+	result = {'engine': engine, 'scenario': scenario, 'size': size, 'ticks': ticks}
+	previous = {'windowSize': sim_core.windowSize}
+	try:
+		sim = buildSimulation(engine, scenario, size, seed)
+		if engine == 'organism.update':
+			seconds = timeOrganismUpdates(sim, ticks)
+			phases = None
+		elif engine == 'viewer':
+			phases, seconds = timeViewer(sim, ticks)
+		else:
+			phases = timePhases(sim, ticks)
+			seconds = sum(phases.values())
+	except Exception as error:
+		if engine != 'viewer':
+			raise
+		import tkinter
+		if not isinstance(error, tkinter.TclError):
+			raise
+		result['skipped'] = '{}: {}'.format(type(error).__name__, error)
+		return result
+	finally:
+		sim_core.configure(**previous)
+
+	result['seconds'] = seconds
+	result['ticksPerSecond'] = ticks / seconds if seconds > 0 else float('inf')
+	if phases != None:
+		result['phases'] = {name: total / ticks for name, total in phases.items()}
+	return result
+
+def runBenchmarks(engines, scenarioNames, sizes, ticks, limits = None, seed = 0, imports = importModules):
+	'''
+	Benchmarks every combination of engine, scenario and size.
+	Cases larger than the limit of their engine are recorded as
+	skipped.
+
+	Parameters:
+		engines: The engines to time ('object', 'population',
+				 'organism.update' and 'viewer').
+		scenarioNames: The scenarios to time.
+		sizes: The population sizes to time.
+		ticks: The number of ticks timed in every case.
+		limits (optional): A dictionary of the largest size to run
+						   each engine with. Defaults to
+						   engineLimits.
+		seed (optional): The seed of every case.
+
+	Return Value: A dictionary holding the results.
+	'''
+	if limits == None:
+		limits = engineLimits
+	results = []
+	for engine in engines:
+		for scenario in scenarioNames:
+			for size in sizes:
+				limit = limits.get(engine)
+				if limit != None and size > limit:
+					results.append({'engine': engine, 'scenario': scenario, 'size': size, 'ticks': ticks,
+									'skipped': 'larger than the {} limit of {}'.format(engine, limit)})
+				else:
+					results.append(runCase(engine, scenario, size, ticks, seed))
+	return {'python': platform.python_version(), 'platform': platform.platform(),
+			'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'imports': timeImports(imports), 'results': results}
+
+def compareResults(current, baseline, threshold = .2, phaseThreshold = None):
+	'''
+	Compares benchmark results against a baseline.
+
+	Parameters:
+		current: The results returned by runBenchmarks.
+		baseline: Results loaded from an earlier run.
+		threshold (optional): The largest allowed drop in ticks
+							  per second, as a fraction.
+		phaseThreshold (optional): The largest allowed increase
+								   in the time of any phase, as a
+								   fraction. Phases are not
+								   compared if None.
+
+	Return Value:
+		A list of messages describing each regression. A case
+		of the baseline that was skipped or not run this time
+		counts as a regression.
+	'''
+	def key(result):
+		return (result['engine'], result['scenario'], result['size'])
+	baselineResults = {key(result): result for result in baseline['results'] if 'skipped' not in result}
+	currentResults = {key(result): result for result in current['results']}
+
+	regressions = []
+	for caseKey, old in baselineResults.items():
+		result = currentResults.get(caseKey)
+		name = '{} {} {}'.format(*caseKey)
+		if result == None:
+			regressions.append('{}: not run, baseline {:.3g} ticks/s'.format(name, old['ticksPerSecond']))
+			continue
+		if 'skipped' in result:
+			regressions.append('{}: skipped ({}), baseline {:.3g} ticks/s'.format(name, result['skipped'], old['ticksPerSecond']))
+			continue
+		if result['ticksPerSecond'] < old['ticksPerSecond'] * (1 - threshold):
+			regressions.append('{}: {:.3g} ticks/s, baseline {:.3g}'.format(name, result['ticksPerSecond'], old['ticksPerSecond']))
+		if phaseThreshold != None and 'phases' in result and 'phases' in old:
+			for phase, seconds in result['phases'].items():
+				oldSeconds = old['phases'].get(phase)
+				if oldSeconds != None and seconds > oldSeconds * (1 + phaseThreshold):
+					regressions.append('{} {}: {:.3g} s/tick, baseline {:.3g}'.format(name, phase, seconds, oldSeconds))
+	return regressions
+
+def main():
+	'''
+	Runs the benchmarks from the command line.
+	'''
+	parser = argparse.ArgumentParser(description='Benchmark the natural selection simulation.')
+	parser.add_argument('--engines', nargs='+', default=list(engineLimits), choices=list(engineLimits))
+	parser.add_argument('--scenarios', nargs='+', default=list(scenarios), choices=list(scenarios))
+	parser.add_argument('--sizes', nargs='+', type=int, default=list(defaultSizes))
+	parser.add_argument('--ticks', type=int, default=3)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--no-limits', action='store_true', help='run every engine at every size')
+	parser.add_argument('--output', default=None, help='JSON file to write (default: standard output)')
+	parser.add_argument('--baseline', default=None, help='JSON results to compare against')
+	parser.add_argument('--threshold', type=float, default=.2, help='allowed drop in ticks per second')
+	parser.add_argument('--phase-threshold', type=float, default=None, help='allowed increase in phase time')
+	parser.add_argument('--import-target', type=float, default=importTimeTarget, help='allowed seconds per import')
+	arguments = parser.parse_args()
+
+	limits = {} if arguments.no_limits else engineLimits
+	results = runBenchmarks(arguments.engines, arguments.scenarios, arguments.sizes, arguments.ticks,
+							limits, arguments.seed)
+	text = json.dumps(results, indent=1)
+	if arguments.output == None:
+		print(text)
+	else:
+		with open(arguments.output, 'w') as output:
+			output.write(text)
+
+	regressions = checkImports(results['imports'], arguments.import_target)
+	if arguments.baseline != None:
+		with open(arguments.baseline) as baselineFile:
+			baseline = json.load(baselineFile)
+		regressions += compareResults(results, baseline, arguments.threshold, arguments.phase_threshold)
+	for regression in regressions:
+		print('REGRESSION ' + regression, file=sys.stderr)
+	if regressions:
+		sys.exit(1)
+
+if __name__ == '__main__':
+	main()
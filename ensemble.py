@@ -0,0 +1,151 @@
+'''
+ensemble.py
+
+Runs many independent headless simulations at once by spreading
+them over a pool of worker processes. Every run gets its own seed
+so ensembles are reproducible, and the result of each run is handed
+back as soon as it finishes.
+
+Run from the command line to print one JSON result per line:
+
+    python ensemble.py --runs 100 --workers 8
+'''
+
+import argparse
+import concurrent.futures
+import json
+import random
+import sim_core
+
+# the engines a headless simulation can be run with
+engineNames = ('object', 'population')
+
+def newSimulation(engine = 'object', seed = None):
+	'''
+	Creates a simulation with its starting organisms spawned.
+
+	Parameters:
+		engine (optional): 'object' for a sim_core.simulation or
+						   'population' for a population.population.
+		seed (optional): The seed for the random number generator
+						 (the random module for a simulation, the
+						 population's own generator otherwise).
+
+	Return Value: The new simulation.
+	'''
+	if engine == 'object':
+		random.seed(seed)
+		sim = sim_core.simulation()
+	elif engine == 'population':
+		import population
+		sim = population.population(seed=seed)
+	else:
+		raise ValueError('unknown engine: {}'.format(engine))
+	sim.spawnOrganisms()
+	return sim
+
+def tickLimit(ticks):
+	'''
+	Returns the largest number of ticks of a run, which is
+	sim_core.gameTicks unless ticks is given.
+	'''
+	if ticks == None:
+		return sim_core.gameTicks
+	return ticks
+
+def summarizeRun(sim, seed, ticksRun):
+	'''
+	Summarizes the final state of a finished simulation.
+
+	Parameters:
+		sim: The finished simulation (or population).
+		seed: The seed the run was started with.
+		ticksRun: The number of ticks the run lasted.
+
+	Return Value:
+		A dictionary holding the seed, the tick the run ended on,
+		the number of survivors of each type and the mean size
+		and speed of the survivors of each type.
+	'''
+	traits = {}
+	for organism in sim.getOrganisms():
+		traits.setdefault(organism.getType(), []).append((organism.getSize(), organism.getSpeed()))
+
+	survivors = {}
+	summaries = {}
+	for organismType, values in traits.items():
+		survivors[organismType] = len(values)
+		summaries[organismType] = {'size': sum(size for size, speed in values) / len(values),
+								   'speed': sum(speed for size, speed in values) / len(values)}
+	return {'seed': seed, 'ticks': ticksRun, 'survivors': survivors, 'traits': summaries}
+
+def runOne(seed, engine = 'object', ticks = None, timeBudget = None):
+	'''
+	Runs a single headless simulation from start to finish.
+
+	Parameters:
+		seed: The seed for the random number generator.
+		engine (optional): 'object' for a sim_core.simulation or
+						   'population' for a population.population.
+		ticks (optional): The largest number of ticks to run.
+						  Defaults to sim_core.gameTicks.
+		timeBudget (optional): The longest the run may take in
+							   seconds.
+
+	Return Value: The summary of the run (see summarizeRun).
+	'''
+	sim = newSimulation(engine, seed)
+	ticksRun = sim_core.runSimulation(sim, tickLimit(ticks), timeBudget)
+	return summarizeRun(sim, seed, ticksRun)
+
+def runEnsemble(runs, seeds = None, workers = None, engine = 'object', ticks = None, timeBudget = None):
+	'''
+	Runs independent simulations in a pool of worker processes
+	and yields their results in the order they finish.
+
+	Parameters:
+		runs: The number of simulations to run.
+		seeds (optional): A list of one seed per run. Defaults to
+						  0, 1, 2, ...
+		workers (optional): The number of worker processes.
+							Defaults to the number of CPUs.
+		engine, ticks, timeBudget (optional): Passed on to runOne.
+
+	Return Value: A generator of run summaries (see summarizeRun).
+	'''
+	if seeds == None:
+		seeds = range(runs)
+	seeds = list(seeds)
+	if len(seeds) != runs:
+		raise ValueError('expected {} seeds, got {}'.format(runs, len(seeds)))
+
+	executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+	try:
+		futures = [executor.submit(runOne, seed, engine, ticks, timeBudget) for seed in seeds]
+		for future in concurrent.futures.as_completed(futures):
+			yield future.result()
+	finally:
+		# stop any queued runs if the caller stops early
+		executor.shutdown(cancel_futures=True)
+
+def main():
+	'''
+	Runs an ensemble from the command line and prints the result
+	of each run as a line of JSON.
+	'''
+	parser = argparse.ArgumentParser(description='Run many headless natural selection simulations.')
+	parser.add_argument('--runs', type=int, default=100)
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--engine', choices=engineNames, default='object')
+	parser.add_argument('--ticks', type=int, default=None)
+	parser.add_argument('--time-budget', type=float, default=None)
+	parser.add_argument('--first-seed', type=int, default=0)
+	arguments = parser.parse_args()
+
+	seeds = range(arguments.first_seed, arguments.first_seed + arguments.runs)
+	for result in runEnsemble(arguments.runs, seeds, arguments.workers, arguments.engine,
+							  arguments.ticks, arguments.time_budget):
+		print(json.dumps(result), flush=True)
+
+if __name__ == '__main__':
+	main()
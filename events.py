@@ -0,0 +1,351 @@
+'''
+events.py
+
+Records what happens to individual organisms during a simulation
+(every kill and every starvation) without formatting any text while
+the simulation runs. An eventLog packs each event into a fixed-size
+binary record in a preallocated ring buffer. Without an output file
+the ring keeps the latest capacity events; with one, the ring is
+written to the file in a single write whenever it fills up, so the
+whole history of a long run is kept. An eventReader maps such a file
+and decodes its records only as they are read.
+
+    sim = sim_core.simulation()
+    sim.attachEventLog(eventLog(output = 'run.events'))
+    ...
+    for tick, kind, actor, victim, actorSize, victimSize, x, y in eventReader('run.events'):
+        ...
+
+Setting sim_core.eventLog to True gives every new simulation (or
+population) an in-memory eventLog.
+
+Run from the command line, for example:
+
+    python events.py record --engine population --ticks 500 --output run.events
+    python events.py show run.events --kind starvation --limit 20
+'''
+
+import argparse
+import struct
+import numpy
+import ensemble
+import sim_core
+
+# event kinds
+KILL = 0 # the actor ate the victim
+STARVATION = 1 # the actor starved; there is no victim
+
+kindNames = ('kill', 'starvation')
+
+# tick, kind, actor id, victim id, actor size, victim size and the
+# position of the organism that died
+recordFormat = '<qBqqdddd'
+recordStruct = struct.Struct(recordFormat)
+recordSize = recordStruct.size
+
+# the same layout as a NumPy record, for reading and writing many
+# events at once
+recordType = numpy.dtype([('tick', '<i8'), ('kind', 'u1'), ('actor', '<i8'), ('victim', '<i8'),
+						  ('actorSize', '<f8'), ('victimSize', '<f8'), ('x', '<f8'), ('y', '<f8')])
+
+# the header of an event file: magic and record size
+fileMagic = b'NSE1'
+headerFormat = '<4sI'
+headerSize = struct.calcsize(headerFormat)
+
+def decodeRecord(record):
+	'''
+	Turns an unpacked record into an event tuple (tick, kind,
+	actor, victim, actorSize, victimSize, x, y) whose kind is one
+	of kindNames.
+	'''
+	return record[:1] + (kindNames[record[1]],) + record[2:]
+
+class eventLog:
+	'''
+	This class records the events of a simulation into a
+	preallocated ring buffer of binary records.
+	'''
+
+	def __init__(self, capacity = 65536, output = None):
+		'''
+		Allocates the ring buffer and opens the output (if any).
+
+		Parameters:
+			capacity (optional): The number of events the ring
+								 buffer holds.
+			output (optional): A file name or a file opened for
+							   binary writing. When given, every
+							   event is written to it; otherwise
+							   only the latest capacity events are
+							   kept.
+		'''
+		self.capacity = capacity
+		self.buffer = bytearray(capacity * recordSize)
+		self.records = numpy.frombuffer(self.buffer, dtype=recordType)
+		self.next = 0 # the slot the next event is written to
+		self.held = 0 # the number of events in the ring buffer
+		self.recorded = 0
+		self.overwritten = 0
+		self.written = 0
+
+		self.closeOutput = isinstance(output, str)
+		if self.closeOutput:
+			output = open(output, 'wb')
+		self.output = output
+		if self.output != None:
+			self.output.write(struct.pack(headerFormat, fileMagic, recordSize))
+
+	def __len__(self):
+		return self.held
+
+	def makeRoom(self):
+		'''
+		Makes room for at least one more event, flushing the ring
+		buffer if there is an output and dropping the oldest event
+		otherwise.
+		'''
+		if self.held < self.capacity:
+			return
+		if self.output != None:
+			self.flush()
+		else:
+			self.held -= 1
+			self.overwritten += 1
+
+	def record(self, tick, kind, actor, victim, actorSize, victimSize, x, y):
+		'''
+		Records a single event.
+		'''
+		self.makeRoom()
+		recordStruct.pack_into(self.buffer, self.next * recordSize, tick, kind, actor, victim, actorSize, victimSize, x, y)
+		self.next = (self.next + 1) % self.capacity
+		self.held += 1
+		self.recorded += 1
+
+	def recordKill(self, tick, predator, prey, predatorSize, preySize, x, y):
+		'''
+		Records that the predator (an organism id) ate the prey
+		at (x, y).
+		'''
+		self.record(tick, KILL, predator, prey, predatorSize, preySize, x, y)
+
+	def recordStarvation(self, tick, organism, size, x, y):
+		'''
+		Records that an organism (an id) starved at (x, y).
+		'''
+		self.record(tick, STARVATION, organism, -1, size, numpy.nan, x, y)
+
+	def recordMany(self, tick, kind, actors, victims, actorSizes, victimSizes, x, y):
+		'''
+		Records many events of one kind at once. Every argument
+		after kind is an array (or a single value shared by all
+		the events).
+		'''
+		count = len(actors)
+		events = numpy.empty(count, dtype=recordType)
+		events['tick'] = tick
+		events['kind'] = kind
+		events['actor'] = actors
+		events['victim'] = victims
+		events['actorSize'] = actorSizes
+		events['victimSize'] = victimSizes
+		events['x'] = x
+		events['y'] = y
+		self.recorded += count
+
+		if self.output == None and count > self.capacity:
+			# only the latest events fit
+			self.overwritten += count - self.capacity
+			events = events[count - self.capacity:]
+			count = self.capacity
+
+		start = 0
+		while start < count:
+			if self.output != None and self.held == self.capacity:
+				self.flush()
+			chunk = min(count - start, self.capacity - self.next)
+			if self.output != None:
+				chunk = min(chunk, self.capacity - self.held)
+			self.records[self.next:self.next + chunk] = events[start:start + chunk]
+			self.next = (self.next + chunk) % self.capacity
+			self.held += chunk
+			start += chunk
+		if self.held > self.capacity:
+			self.overwritten += self.held - self.capacity
+			self.held = self.capacity
+
+	def recordKills(self, tick, predators, prey, predatorSizes, preySizes, x, y):
+		'''
+		Records many kills at once (see recordKill).
+		'''
+		self.recordMany(tick, KILL, predators, prey, predatorSizes, preySizes, x, y)
+
+	def recordStarvations(self, tick, organisms, sizes, x, y):
+		'''
+		Records many starvations at once (see recordStarvation).
+		'''
+		self.recordMany(tick, STARVATION, organisms, -1, sizes, numpy.nan, x, y)
+
+	def slices(self):
+		'''
+		Returns the one or two slices of the ring buffer holding
+		its events, oldest first.
+		'''
+		start = (self.next - self.held) % self.capacity
+		if start + self.held <= self.capacity:
+			return [slice(start, start + self.held)]
+		return [slice(start, self.capacity), slice(0, self.next)]
+
+	def flush(self):
+		'''
+		Writes the events in the ring buffer to the output and
+		empties it. Does nothing without an output.
+		'''
+		if self.output == None or self.held == 0:
+			return
+		view = memoryview(self.buffer)
+		for part in self.slices():
+			self.output.write(view[part.start * recordSize:part.stop * recordSize])
+		self.written += self.held
+		self.held = 0
+		self.output.flush()
+
+	def arrays(self):
+		'''
+		Returns a copy of the events in the ring buffer, oldest
+		first, as a NumPy record array (see recordType).
+		'''
+		return numpy.concatenate([self.records[part] for part in self.slices()])
+
+	def events(self, kind = None):
+		'''
+		Decodes the events in the ring buffer, oldest first, as
+		they are iterated over.
+
+		Parameters:
+			kind (optional): Only decode events of this kind (see
+							 kindNames).
+
+		Return Value: A generator of event tuples (see decodeRecord).
+		'''
+		for part in self.slices():
+			for index in range(part.start, part.stop):
+				record = recordStruct.unpack_from(self.buffer, index * recordSize)
+				if kind == None or kindNames[record[1]] == kind:
+					yield decodeRecord(record)
+
+	def close(self):
+		'''
+		Flushes the remaining events and closes the output if the
+		log opened it.
+		'''
+		self.flush()
+		if self.closeOutput and self.output != None:
+			self.output.close()
+			self.output = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+
+class eventReader:
+	'''
+	This class reads an event file written by an eventLog. The
+	file is mapped into memory, so only the records that are read
+	are loaded and decoded.
+	'''
+
+	def __init__(self, path):
+		'''
+		Maps an event file.
+
+		Parameters:
+			path: The name of the file.
+		'''
+		with open(path, 'rb') as eventFile:
+			header = eventFile.read(headerSize)
+		if len(header) < headerSize or struct.unpack(headerFormat, header) != (fileMagic, recordSize):
+			raise ValueError('{} is not an event file'.format(path))
+		self.records = numpy.memmap(path, dtype=recordType, mode='r', offset=headerSize)
+
+	def __len__(self):
+		return len(self.records)
+
+	def __getitem__(self, index):
+		'''
+		Decodes a single event (see decodeRecord).
+		'''
+		return decodeRecord(self.records[index].item())
+
+	def __iter__(self):
+		return self.events()
+
+	def events(self, kind = None, chunkSize = 65536):
+		'''
+		Decodes the events in the file, a chunk at a time, as
+		they are iterated over.
+
+		Parameters:
+			kind (optional): Only decode events of this kind (see
+							 kindNames).
+			chunkSize (optional): The number of records loaded at
+								  once.
+
+		Return Value: A generator of event tuples (see decodeRecord).
+		'''
+		for start in range(0, len(self.records), chunkSize):
+			chunk = self.records[start:start + chunkSize]
+			if kind != None:
+				chunk = chunk[chunk['kind'] == kindNames.index(kind)]
+			for record in chunk.tolist():
+				yield decodeRecord(record)
+
+	def select(self, kind):
+		'''
+		Returns a NumPy record array of every event of one kind
+		(see kindNames).
+		'''
+		return self.records[self.records['kind'] == kindNames.index(kind)]
+
+def main():
+	'''
+	Records the events of a headless simulation or prints the
+	events in a file from the command line.
+	'''
+	parser = argparse.ArgumentParser(description='Record or show the kills and starvations of a natural selection simulation.')
+	parser.add_argument('command', choices=('record', 'show'))
+	parser.add_argument('file', nargs='?', help='event file to show')
+	parser.add_argument('--engine', choices=ensemble.engineNames, default='object')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--ticks', type=int, default=None, help='largest number of ticks (default: sim_core.gameTicks)')
+	parser.add_argument('--output', default='simulation.events', help='event file to write')
+	parser.add_argument('--kind', choices=kindNames, default=None, help='only show events of this kind')
+	parser.add_argument('--limit', type=int, default=None, help='largest number of events to show')
+	arguments = parser.parse_args()
+
+	if arguments.command == 'record':
+		sim = ensemble.newSimulation(arguments.engine, arguments.seed)
+		with eventLog(output=arguments.output) as log:
+			sim.attachEventLog(log)
+			sim_core.runSimulation(sim, ensemble.tickLimit(arguments.ticks))
+			sim.detachEventLog()
+		print('{} events written to {}'.format(log.recorded, arguments.output))
+	else:
+		if arguments.file == None:
+			parser.error('show needs an event file')
+		reader = eventReader(arguments.file)
+		for number, event in enumerate(reader.events(arguments.kind)):
+			if arguments.limit != None and number >= arguments.limit:
+				break
+			tick, kind, actor, victim, actorSize, victimSize, x, y = event
+			if kind == 'kill':
+				print('tick {}: {} (size {:.2f}) killed {} (size {:.2f}) at ({:.1f}, {:.1f})'.format(
+					tick, actor, actorSize, victim, victimSize, x, y))
+			else:
+				print('tick {}: {} (size {:.2f}) starved at ({:.1f}, {:.1f})'.format(tick, actor, actorSize, x, y))
+
+if __name__ == '__main__':
+	main()
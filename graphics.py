@@ -62,6 +62,22 @@ http://mcsp.wartburg.edu/zelle/python for a quick reference"""
 
 __version__ = "5.0"
 
+# Changes for the natural selection simulation
+#     * GraphWin.beginFrame, endFrame and frame batch the drawing of a
+#       whole frame into a single update of the window, optionally
+#       paced to a frame rate with update(rate)
+#     * The Tk root is created the first time a window or image needs
+#       it instead of at import time
+#     * Image.setPixels sets a whole block of pixels with a single call
+#     * Transform.screenArrays, GraphWin.toScreenArrays and
+#       toScreenBoxes convert whole NumPy arrays of points at once and
+#       GraphWin.moveCirclesTo places many circles with them
+#     * GraphWin.updateItems sends the coordinates and fills of many
+#       canvas items to Tk as one Tcl script; moveCirclesTo and
+#       setFills use it
+#     * GraphWin.items is an insertion-ordered dict, so adding and
+#       removing items takes constant time
+
 # Version 5 8/26/2016
 #     * update at bottom to fix MacOS issue causing askopenfile() to hang
 #     * update takes an optional parameter specifying update rate
@@ -161,6 +177,7 @@ __version__ = "5.0"
 #     Added Entry boxes.
 
 import time, os, sys
+import contextlib
 
 try:  # import as appropriate for 2.x vs. 3.x
    import tkinter as tk
@@ -182,8 +199,19 @@ BAD_OPTION = "Illegal option value"
 ##########################################################################
 # global variables and funtions
 
-_root = tk.Tk()
-_root.withdraw()
+# the hidden Tk root shared by all windows, created by _getRoot
+_root = None
+
+def _getRoot():
+    """Returns the Tk root, creating it the first time it is needed,
+    so importing the module does not start Tk or need a display."""
+    global _root
+    if _root is None:
+        _root = tk.Tk()
+        _root.withdraw()
+        # MacOS fix 1
+        _root.update()
+    return _root
 
 _update_lasttime = time.time()
 
@@ -198,7 +226,7 @@ def update(rate=None):
         else:
             _update_lasttime = now
 
-    _root.update()
+    _getRoot().update()
 
 ############################################################################
 # Graphics classes start here
@@ -210,7 +238,7 @@ class GraphWin(tk.Canvas):
     def __init__(self, title="Graphics Window",
                  width=200, height=200, autoflush=True):
         assert type(title) == type(""), "Title must be a string"
-        master = tk.Toplevel(_root)
+        master = tk.Toplevel(_getRoot())
         master.protocol("WM_DELETE_WINDOW", self.close)
         tk.Canvas.__init__(self, master, width=width, height=height,
                            highlightthickness=0, bd=0)
@@ -218,7 +246,7 @@ class GraphWin(tk.Canvas):
         self.pack()
         master.resizable(0,0)
         self.foreground = "black"
-        self.items = []
+        self.items = {} # insertion ordered, used as an ordered set
         self.mouseX = None
         self.mouseY = None
         self.bind("<Button-1>", self._onClick)
@@ -231,6 +259,8 @@ class GraphWin(tk.Canvas):
         self.closed = False
         master.lift()
         self.lastKey = ""
+        self._frameDepth = 0
+        self._frameAutoflush = autoflush
         if autoflush: _root.update()
 
     def __repr__(self):
@@ -304,6 +334,47 @@ class GraphWin(tk.Canvas):
         """Update drawing to the window"""
         self.__checkOpen()
         self.update_idletasks()
+
+    def beginFrame(self):
+        """Start a frame. Until the matching endFrame, drawing,
+        undrawing, moving and reconfiguring objects in this window
+        are queued instead of updating the window one at a time.
+        Frames may be nested."""
+        if self._frameDepth == 0:
+            self._frameAutoflush = self.autoflush
+            self.autoflush = False
+        self._frameDepth += 1
+
+    def endFrame(self, rate=None):
+        """End a frame started with beginFrame. Ending the outermost
+        frame updates the window exactly once. If rate is given the
+        update is paced like update(rate), holding frames to at most
+        rate per second."""
+        if self._frameDepth == 0:
+            raise GraphicsError("endFrame called without beginFrame")
+        self._frameDepth -= 1
+        if self._frameDepth == 0:
+            self.autoflush = self._frameAutoflush
+            if not self.closed:
+                update(rate)
+
+    def inFrame(self):
+        return self._frameDepth > 0
+
+    @contextlib.contextmanager
+    def frame(self, rate=None):
+        """Context manager that wraps its block in beginFrame and
+        endFrame(rate):
+
+            with win.frame():
+                circle.move(1, 0)
+                square.undraw()
+        """
+        self.beginFrame()
+        try:
+            yield self
+        finally:
+            self.endFrame(rate)
         
     def getMouse(self):
         """Wait for mouse click and return Point object representing
@@ -370,6 +441,73 @@ class GraphWin(tk.Canvas):
         else:
             return x,y
                       
+    def toScreenArrays(self, x, y):
+        """Convert arrays (or sequences) of world coordinates to
+        screen coordinates all at once. Returns a pair of NumPy
+        arrays rounded the same way as toScreen."""
+        trans = self.trans
+        if trans:
+            return trans.screenArrays(x, y)
+        else:
+            import numpy
+            return numpy.asarray(x), numpy.asarray(y)
+
+    def toScreenBoxes(self, x, y, radius):
+        """Return an N x 4 NumPy array of the screen bounding boxes
+        (x1, y1, x2, y2) of circles with the given centers and radii,
+        the same coordinates Circle draws with."""
+        import numpy
+        x = numpy.asarray(x, dtype=float)
+        y = numpy.asarray(y, dtype=float)
+        radius = numpy.asarray(radius, dtype=float)
+        x1, y1 = self.toScreenArrays(x - radius, y - radius)
+        x2, y2 = self.toScreenArrays(x + radius, y + radius)
+        return numpy.stack((x1, y1, x2, y2), axis=-1)
+
+    def moveCirclesTo(self, circles, x, y):
+        """Move many drawn circles so they are centered on the given
+        world coordinates, computing all their screen coordinates in
+        one call to toScreenBoxes."""
+        self.__checkOpen()
+        radii = [circle.radius for circle in circles]
+        boxes = self.toScreenBoxes(x, y, radii).tolist()
+        coords = []
+        for circle, cx, cy, radius, box in zip(circles, x, y, radii, boxes):
+            circle.p1.x = cx - radius
+            circle.p1.y = cy - radius
+            circle.p2.x = cx + radius
+            circle.p2.y = cy + radius
+            if circle.canvas is self:
+                coords.append((circle.id, box))
+        self.updateItems(coords)
+
+    def setFills(self, objects, colors):
+        """Set the fill color of many drawn objects with a single
+        call to updateItems."""
+        fills = []
+        for item, color in zip(objects, colors):
+            if "fill" not in item.config:
+                raise GraphicsError(UNSUPPORTED_METHOD)
+            item.config["fill"] = color
+            if item.canvas is self:
+                fills.append((item.id, color))
+        self.updateItems(fills=fills)
+
+    def updateItems(self, coords=(), fills=()):
+        """Change many canvas items with one Tcl command instead of one
+        coords or itemconfig call per item. coords is a sequence of
+        (item id, screen coordinates) pairs and fills a sequence of
+        (item id, color) pairs."""
+        self.__checkOpen()
+        canvas = self._w
+        script = ["%s coords %d %s" % (canvas, item, " ".join(map(str, values)))
+                  for item, values in coords]
+        script += ["%s itemconfigure %d -fill {%s}" % (canvas, item, color)
+                   for item, color in fills]
+        if script:
+            self.tk.eval("\n".join(script))
+        self.__autoflush()
+
     def toWorld(self, x, y):
         trans = self.trans
         if trans:
@@ -387,13 +525,13 @@ class GraphWin(tk.Canvas):
             self._mouseCallback(Point(e.x, e.y))
 
     def addItem(self, item):
-        self.items.append(item)
+        self.items[item] = None
 
     def delItem(self, item):
-        self.items.remove(item)
+        del self.items[item]
 
     def redraw(self):
-        for item in self.items[:]:
+        for item in list(self.items):
             item.undraw()
             item.draw(self)
         self.update()
@@ -419,6 +557,14 @@ class Transform:
         xs = (x-self.xbase) / self.xscale
         ys = (self.ybase-y) / self.yscale
         return int(xs+0.5),int(ys+0.5)
+
+    def screenArrays(self,x,y):
+        # Returns NumPy arrays of screen coordinates for arrays of
+        # world coordinates, rounded the same way as screen
+        import numpy
+        xs = (numpy.asarray(x, dtype=float)-self.xbase) / self.xscale
+        ys = (self.ybase-numpy.asarray(y, dtype=float)) / self.yscale
+        return numpy.trunc(xs+0.5).astype(int), numpy.trunc(ys+0.5).astype(int)
         
     def world(self,xs,ys):
         # Returns xs,ys in world coordinates
@@ -787,7 +933,7 @@ class Entry(GraphicsObject):
         self.anchor = p.clone()
         #print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = tk.StringVar(_getRoot())
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -882,10 +1028,10 @@ class Image(GraphicsObject):
         self.imageId = Image.idCount
         Image.idCount = Image.idCount + 1
         if len(pixmap) == 1: # file name provided
-            self.img = tk.PhotoImage(file=pixmap[0], master=_root)
+            self.img = tk.PhotoImage(file=pixmap[0], master=_getRoot())
         else: # width and height provided
             width, height = pixmap
-            self.img = tk.PhotoImage(master=_root, width=width, height=height)
+            self.img = tk.PhotoImage(master=_getRoot(), width=width, height=height)
 
     def __repr__(self):
         return "Image({}, {}, {})".format(self.anchor, self.getWidth(), self.getHeight())
@@ -943,6 +1089,16 @@ class Image(GraphicsObject):
         
         """
         self.img.put("{" + color +"}", (x, y))
+
+    def setPixels(self, rows, x=0, y=0):
+        """Sets a whole block of pixels at once. rows is a sequence
+        of rows of color strings (like those returned by
+        color_rgb), the first row being the top of the block, and
+        (x,y) is the top left pixel of the block.
+
+        """
+        data = " ".join(["{" + " ".join(row) + "}" for row in rows])
+        self.img.put(data, (x, y))
         
 
     def save(self, filename):
@@ -1008,8 +1164,7 @@ def test():
 #MacOS fix 2
 #tk.Toplevel(_root).destroy()
 
-# MacOS fix 1
-update()
+# MacOS fix 1 is applied when the root is created (see _getRoot)
 
 if __name__ == "__main__":
     test()
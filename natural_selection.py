@@ -10,509 +10,711 @@ The largest fitter organisms will survive.
 by Owen Davis-Bower
 '''
 
+import asyncio
 import random
+import time
 from graphics import *
-
-# Simulation configuration
-windowSize = 100
-tickTime = .5
-gameTicks = 200
-eventLog = False
-speedFactor = 1
+import sim_core
+
+# Viewer configuration (the simulation itself is configured in sim_core.py)
+tickTime = .5 # set to None to let the simulation run as fast as it can
+timeBudget = None # the longest a simulation may run for in seconds
+frameRate = None # frames drawn per second, skipping ticks in between; None draws every tick
+detailThreshold = 3000 # above this many organisms a density heatmap is drawn instead of circles
+heatmapCellPixels = 5 # width and height of a heatmap cell in pixels
 loop = False
+threaded = False # run the simulation in its own thread and draw its latest snapshot
+runAsync = False # run with the asyncio loop, which keeps the window responsive between ticks
+pumpRate = 60 # times per second the window handles its events when run with asyncio
 
-class organism:
-	'''
-	This class represents organism objects that all 
-	have different traits and allows them to move about
-	and consume each other every game tick.
-	'''
-	
-	def __init__(self, window, x, y, size, speed, organismType):
+# fill color for each organism type
+organismColors = {'omnivore': 'orange',
+				  'herbivore': 'blue',
+				  'carnivore': 'red',
+				  'plant': color_rgb(10, 117, 31)}
+
+class simInterface:
+
+	def __init__(self, worldSize = 100):
 		'''
-		Initializes the organism by assigning it's traits
-		and drawing the organism on the screen.
+		Initializes the simulation window.
 
 		Parameters:
-			window: The graphical window to draw on.
-			x, y: The x and y starting coordinates of the organism.
-			size: The size of the organism. This effects the graphical
-			      size of the organism as well as the strength of the
-			      organism in combat.
-			speed: The maximum speed at which an organism can move each
-			       game tick.
-			organismType: The type of an organism (Plant, omnivore, 
-						  herbivore, or carnivore)
-
-		Return Value: none
+			worldSize (optional): The habitat spans -worldSize to
+								  worldSize on both axes.
 		'''
-		self.pos = [x, y]
-		self.size = size
-		self.speed = speed
-		self.type = organismType
-		self.prey = self.preyList()
-		self.hunger = 50
+		# initialize window
+		self.win = GraphWin('Natural Selection Simulation', 700, 700)
 
-		self.organismGraphic = Circle(Point(self.pos[0], self.pos[1]), self.size)
+		self.lowerInterface = None
+		self.setWorldSize(worldSize)
 
-		# assign a color based upon organism type
-		if self.type == 'omnivore':
-			self.organismGraphic.setFill('orange')
-		elif self.type == 'herbivore':
-			self.organismGraphic.setFill('blue')
-		elif self.type == 'carnivore':
-			self.organismGraphic.setFill('red')
-		elif self.type ==  'plant':
-			self.organismGraphic.setFill(color_rgb(10, 117, 31))
-		self.organismGraphic.draw(window)
+		self.organismCircle = None
 
-	def update(self, organismsList, window):
+	def setWorldSize(self, worldSize):
+		'''
+		Transforms the coordinates of the window so it shows a
+		habitat spanning -worldSize to worldSize on both axes,
+		with the lower interface below it.
 		'''
-		Updates the organism's position and hunger every
-		simulation tick.
+		self.worldSize = worldSize
+		# the interface is laid out for a habitat of size 100
+		self.scale = worldSize / 100
+		if self.lowerInterface != None:
+			self.lowerInterface.undraw()
+		# transform coordinates
+		self.win.setCoords(-worldSize, -1.5 * worldSize, worldSize, worldSize)
 
-		Parameters:
-			organismsList: the list of organisms (including
-						   the organism itself)
-			window: The graphical window which the organism
-					resides on.
+		self.lowerInterface = self.createLowerInterface()
+		self.lowerInterface.draw(self.win)
 
-		Return Value: none
+	def layoutPoint(self, x, y):
 		'''
-		self.closestTarget = self.nearestTarget(organismsList)
-
-		# move the organism
-		if self.isPrey(self.closestTarget):
-			self.moveToTarget(self.closestTarget)
-		else:
-			self.moveRandom()
+		Returns the Point at (x, y) of the interface layout,
+		scaled to the size of the habitat.
+		'''
+		return Point(x * self.scale, y * self.scale)
 
-		# keep the organisms from leaving the screen
-		self.stayInScreen()
+	def getWin(self):
+		'''
+		Returns the simulation window.
+		'''
+		return self.win
 
-		self.draw(window)
+	def createLowerInterface(self):
+		'''
+		Draws the interface at the bottom of the screen.
+		'''
+		interfaceRectangle = Rectangle(self.layoutPoint(-100, -100), self.layoutPoint(100, -150))
+		interfaceRectangle.setFill("gray")
+		return interfaceRectangle
 
-		# checks for collisions and responds accordingly
-		self.checkCollisions(organismsList)
+	def close(self):
+		'''
+		Closes the graphical window.
+		'''
+		self.win.close()
 
-		self.hunger += -0.5
-		if self.hunger <= 0:
-			if eventLog:
-				print('Self starved')
-			self.die(organismsList)
+class renderScheduler:
+	'''
+	This class decides which ticks of a simulation are drawn so
+	that the simulation can advance many ticks between frames. A
+	frame is due once 1 / frameRate seconds have passed since the
+	last one; every tick before that is not drawn. A tick that
+	runs past the frame budget simply makes the frames it
+	overlapped be dropped, so the window keeps showing a live
+	picture at up to frameRate frames per second while the
+	simulation runs at compute speed.
+	'''
 
-	def isPrey(self, target):
+	def __init__(self, frameRate):
 		'''
-		Given a target organism, checks if the target is prey
-		for the checking organism.
+		Initializes the scheduler.
 
 		Parameters:
-			target: The target organism that is being checked.
+			frameRate: The largest number of frames drawn per
+					   second.
+		'''
+		self.frameRate = frameRate
+		self.frameTime = 1 / frameRate
+		self.nextFrame = None
+		self.lastFrameDrawn = True
+		self.framesDrawn = 0
+		self.ticksSkipped = 0
 
-		Return Value:
-			True if the target organism is prey for the self;
-			else False.
+	def frameDue(self):
 		'''
-		if target.getType() == 'plant' and 'plant' in self.prey:
-			return True
-		elif target.getType() in self.prey and target.getSize() < self.size:
-			return True
-		return False
+		Returns True if the current tick should be drawn.
+		'''
+		now = time.perf_counter()
+		self.lastFrameDrawn = self.nextFrame == None or now >= self.nextFrame
+		if self.lastFrameDrawn:
+			self.nextFrame = now + self.frameTime
+			self.framesDrawn += 1
+		else:
+			self.ticksSkipped += 1
+		return self.lastFrameDrawn
+
+class naturalSelectionSim:
+	'''
+	This class is a graphical viewer for a headless simulation
+	(see sim_core.py). It draws the organisms of the simulation
+	it is attached to and lets the user spawn new organisms by
+	clicking inside the habitat.
+	'''
 
-	def preyList(self):
+	def __init__(self, sim = None):
 		'''
-		Taking in the self organism's type, returns a list of
-		prey types. For example an herbivore will only return
-		'plant'.
+		Initializes the simulation window and interface and
+		attaches the viewer to a simulation.
 
-		Return Value:
-			A tuple containing all of the acceptable prey types.
+		Parameters:
+			sim (optional): The simulation to view. Otherwise
+							a new simulation is created.
 		'''
-		if self.type == 'omnivore':
-			return ('plant', 'omnivore', 'herbivore', 'carnivore')
-		elif self.type == 'herbivore':
-			return ('plant')
-		elif self.type == 'carnivore':
-			return ('omnivore', 'herbivore', 'carnivore')
+		self.interface = simInterface(sim_core.windowSize)
+		self.window = self.interface.getWin()
+
+		# the size of the habitat of a simulation watched in
+		# another process; otherwise sim_core.windowSize
+		self.worldSize = None
+
+		# the text and legend drawn in the lower interface, and
+		# the arguments of the displayInformation call that drew
+		# them, so they can be laid out again when the habitat is
+		# resized
+		self.informationGraphics = []
+		self.informationShown = None
+
+		if sim == None:
+			sim = sim_core.simulation()
+		self.simulation = sim
+		self.simulation.attachViewer(self)
+
+		# the circle drawn for each organism
+		self.organismGraphics = {}
+		# the position, size and type each circle was drawn with
+		self.drawnStates = {}
+		# circles of dead organisms, undrawn in the next frame
+		self.deadGraphics = []
+
+		# the density heatmap drawn instead of the circles while
+		# the population is larger than detailThreshold
+		self.heatmap = None
+
+		self.scheduler = None
+		if frameRate != None:
+			self.scheduler = renderScheduler(frameRate)
+		# whether frames are paced to the frame rate of the
+		# scheduler by sleeping, which would block an event loop
+		self.paceFrames = True
 
-	def getPos(self):
+	def runSim(self):
 		'''
-		Returns the position of the given organism as a list
-		containing two points [x, y].
+		Runs the simulation from start to finish.
 		'''
-		return self.pos
+		self.displayInformation()
+
+		self.waitForClick()
+
+		self.simulation.spawnOrganisms()
+		self.drawSimulation(self.simulation)
 
-	def getSize(self):
+		self.update()
+
+		time.sleep(2)
+
+		# destroy all remaining organisms
+		self.clearOrganisms()
+
+	def clearOrganisms(self):
 		'''
-		Returns the size of the given organism as a float value.
+		Undraws every organism (or the heatmap) still on the
+		screen.
 		'''
-		return self.size
+		self.organismsDied(list(self.organismGraphics))
+		with self.window.frame():
+			for graphic in self.deadGraphics:
+				graphic.undraw()
+			self.deadGraphics = []
+			if self.heatmap != None:
+				self.heatmap.undraw()
+				self.heatmap = None
 
-	def getType(self):
+	def waitForClick(self):
 		'''
-		Returns the type of the given organism as a string value.
+		Displays a message on the screen and waits for user
+		input in order to continue.
 		'''
-		return self.type
+		self.startText = Text(Point(0, 0), 'Click anywhere to begin the simulation.')
+		self.startText.setSize(20)
+		self.startText.draw(self.window)
+		self.window.getMouse()
+		self.startText.undraw()
 
-	def die(self, organismsList):
+	def displayInformation(self, message = 'Click anywhere inside the habitat to spawn a new organism.', legend = True):
 		'''
-		"Kills" the given organism by undrawing it and then
-		removing it from the list of organisms.
+		Displays information in the lower interface of simulation
+		window, replacing any shown before.
 
 		Parameters:
-			organismsList: The list to remove the given
-						   organism from.
-
-		Return Value: none
-		'''
-		self.organismGraphic.undraw()
-		organismsList.remove(self)
-
-	def distanceFromTarget(self, target):
+			message (optional): The text shown.
+			legend (optional): Whether to show which color is
+							   which organism type.
 		'''
-		Calculates and returns the distance between the given
-		organism and the target organism.
+		for graphic in self.informationGraphics:
+			graphic.undraw()
+		self.informationShown = (message, legend)
 
-		Parameters:
-			target: A target organism.
+		self.informativeText_1 = Text(self.interface.layoutPoint(0, -105), message)
+		self.informativeText_1.setSize(20)
+		self.informativeText_1.draw(self.window)
+		self.informationGraphics = [self.informativeText_1]
+		if not legend:
+			return
 
-		Return Value: The distance between the given organism
-					  and the target organism.
-		'''
-		return (abs(target.getPos()[0] - self.pos[0]) + abs(target.getPos()[1] - self.pos[1]))
+		self.plantExample = Circle(self.interface.layoutPoint(-90, -120), 3 * self.interface.scale)
+		self.plantExample.setFill(organismColors['plant'])
+		self.plantExample.draw(self.window)
+		self.plantTitle = Text(self.interface.layoutPoint(-75, -120), '= Plant')
+		self.plantTitle.setSize(20)
+		self.plantTitle.draw(self.window)
 
-	def nearestTarget(self, organismsList):
-		'''
-		Searches through the list of other organisms and
-		returns the organism object of the nearest organism.
+		self.herbivoreExample = Circle(self.interface.layoutPoint(-90, -130), 3 * self.interface.scale)
+		self.herbivoreExample.setFill(organismColors['herbivore'])
+		self.herbivoreExample.draw(self.window)
+		self.herbivoreTitle = Text(self.interface.layoutPoint(-69, -130), '= Herbivore')
+		self.herbivoreTitle.setSize(20)
+		self.herbivoreTitle.draw(self.window)
 
-		Parameters:
-			organismsList: The list of living organisms.
+		self.omnivoreExample = Circle(self.interface.layoutPoint(-90, -140), 3 * self.interface.scale)
+		self.omnivoreExample.setFill(organismColors['omnivore'])
+		self.omnivoreExample.draw(self.window)
+		self.omnivoreTitle = Text(self.interface.layoutPoint(-69, -140), '= Omnivore')
+		self.omnivoreTitle.setSize(20)
+		self.omnivoreTitle.draw(self.window)
 
-		Return Value: The organism object of the nearest
-					  organism.
-		'''
-		self.selfIndex = organismsList.index(self)
-		self.otherOrganisms = list(organismsList)
-		self.otherOrganisms.pop(self.selfIndex)
-		self.closestTarget = self.otherOrganisms[0]
-		for organism in self.otherOrganisms[1:]:
-			if self.distanceFromTarget(organism) < self.distanceFromTarget(self.closestTarget):
-				self.closestTarget = organism
-		return self.closestTarget
+		self.informationGraphics += [self.plantExample, self.plantTitle, self.herbivoreExample, self.herbivoreTitle,
+									 self.omnivoreExample, self.omnivoreTitle]
 
-	def moveToTarget(self, target):
+	def drawOrganism(self, organism, moves = None):
 		'''
-		Moves the given organism towards the target organism.
+		Draws the organism. A circle is created for the organism
+		the first time it is drawn and then kept for its whole
+		life, only being moved when the organism moves. The circle
+		is only recreated if the size or type of the organism
+		changes.
 
 		Parameters:
-			target: A target organism.
+			organism: The organism to draw.
+			moves (optional): A tuple of three lists (circles, x,
+							  y). If given, a circle that has to
+							  move is added to it instead of being
+							  moved, so all of the moves of a frame
+							  can be made at once (see drawFrame).
 
 		Return Value: none
 		'''
-		self.targetPosX, self.targetPosY = target.getPos()
-		self.distanceX, self.distanceY = (self.targetPosX - self.pos[0], self.targetPosY - self.pos[1])
-
-		if self.distanceX >= 0:
-			self.velocityX = self.speed * speedFactor
-			if abs(self.distanceX) < abs(self.velocityX):
-				self.velocityX = self.distanceX
-		else:
-			self.velocityX = -self.speed * speedFactor
-			if abs(self.distanceX) < abs(self.velocityX):
-				self.velocityX = self.distanceX
-		self.pos[0] += self.velocityX
-
-		if self.distanceY >= 0:
-			self.velocityY = self.speed * speedFactor
-			if abs(self.distanceY) < abs(self.velocityY):
-				self.velocityX = self.distanceX
-		else:
-			self.velocityY = -self.speed * speedFactor
-			if abs(self.distanceY) < abs(self.velocityY):
-				self.velocityY = self.distanceY
-		self.pos[1] += self.velocityY
+		x, y = organism.getPos()
+		x = float(x)
+		y = float(y)
+		size = organism.getSize()
+		organismType = organism.getType()
+
+		graphic = self.organismGraphics.get(organism)
+		if graphic != None:
+			drawnX, drawnY, drawnSize, drawnType = self.drawnStates[organism]
+			if drawnSize == size and drawnType == organismType:
+				if drawnX != x or drawnY != y:
+					if moves != None:
+						moves[0].append(graphic)
+						moves[1].append(x)
+						moves[2].append(y)
+					else:
+						graphic.move(x - drawnX, y - drawnY)
+					self.drawnStates[organism] = (x, y, size, organismType)
+				return
+			graphic.undraw()
+
+		graphic = Circle(Point(x, y), size)
+		graphic.setFill(organismColors[organismType])
+		graphic.draw(self.window)
+		self.organismGraphics[organism] = graphic
+		self.drawnStates[organism] = (x, y, size, organismType)
+
+	def organismsDied(self, organisms):
+		'''
+		Removes a batch of organisms that have died. Their
+		circles are undrawn by the next call to drawSimulation,
+		in the same frame as the moves of the living.
 
-	def moveRandom(self):
-		'''
-		Moves the given organism randomly in 2D space.
-		'''
-		self.velocity = (random.uniform(-self.speed, self.speed) * speedFactor, random.uniform(-self.speed, self.speed) * speedFactor)
-		self.pos = [self.pos[0] + self.velocity[0], self.pos[1] + self.velocity[1]]
+		Parameters:
+			organisms: A list of dead organisms.
 
-	def stayInScreen(self):
-		'''
-		Prevents the organisms from leaving the screen.
+		Return Value: none
 		'''
-		if self.pos[0] + self.size >= windowSize:
-			self.pos[0] = windowSize - self.size
-		elif self.pos[0] - self.size <= -windowSize:
-			self.pos[0] = -windowSize + self.size
-		elif self.pos[1] + self.size >= windowSize:
-			self.pos[1] = windowSize - self.size
-		elif self.pos[1] - self.size <= -windowSize:
-			self.pos[1] = -windowSize + self.size
+		for organism in organisms:
+			graphic = self.organismGraphics.pop(organism, None)
+			if graphic != None:
+				self.deadGraphics.append(graphic)
+				del self.drawnStates[organism]
 
-	def draw(self, window):
+	def drawSimulation(self, sim):
 		'''
-		Creates a graphical object for the organism based
-		upon it's size and type and then draws it onto the
-		graphic window.
+		Draws the simulation after a tick, unless the render
+		scheduler skips the tick.
 
 		Parameters:
-			window: A graphical window.
+			sim: The simulation to draw.
 
 		Return Value: none
 		'''
-		if self.type != 'plant':
-			if self.organismGraphic:
-				self.organismGraphic.undraw()
-			self.organismGraphic = Circle(Point(self.pos[0], self.pos[1]), self.size)
+		if self.scheduler == None or self.scheduler.frameDue():
+			self.drawFrame(sim)
 
-			# assign a color based upon organism type
-			if self.type == 'omnivore':
-				self.organismGraphic.setFill('orange')
-			elif self.type == 'herbivore':
-				self.organismGraphic.setFill('blue')
-			elif self.type == 'carnivore':
-				self.organismGraphic.setFill('red')
-			elif self.type ==  'plant':
-				self.organismGraphic.setFill(color_rgb(10, 117, 31))
-			self.organismGraphic.draw(window)
-
-	def checkCollision(self, collidingOrganism):
+	def drawFrame(self, sim, rate = None):
 		'''
-		Checks if the given organism is colliding with the
-		"collidingOrganism".
+		Draws every living organism of the simulation and undraws
+		the dead ones as a single frame, so the window is only
+		updated once per frame. Populations larger than
+		detailThreshold are drawn as a density heatmap instead;
+		the circles come back once the population has dropped
+		below 80% of the threshold.
 
 		Parameters:
-			collidingOrganism: The organism to be tested against.
-
-		Return Value:
-			True if the given organism is colliding with the
-			"collidingOrganism"; else returns False.
-		'''
-		self.collidingOrganismPos = collidingOrganism.getPos()
-		self.collidingOrganismsize = collidingOrganism.getSize()
-
-		if (self.pos[0] - self.size) <= self.collidingOrganismPos[0] <= (self.pos[0] + self.size):
-			if (self.pos[1] - self.size) <= self.collidingOrganismPos[1] <= (self.pos[1] + self.size):
-				return True
-		elif (self.collidingOrganismPos[0] - self.collidingOrganismsize) <= self.pos[0] <= (self.collidingOrganismPos[0] + self.collidingOrganismsize):
-			if (self.collidingOrganismPos[1] - self.collidingOrganismsize) <= self.pos[1] <= (self.collidingOrganismPos[1] + self.collidingOrganismsize):
-				return True
-		return False
+			sim: The simulation (or snapshot) to draw.
+			rate (optional): Pace the frame to this many frames
+							 per second (see GraphWin.endFrame).
+							 Defaults to the frame rate of the
+							 render scheduler, if any, unless
+							 paceFrames is False.
 
-	def checkCollisions(self, organismsList):
+		Return Value: none
 		'''
-		Checks if the organism is colliding with any organisms
-		and reacts appropriately by killing one of the
-		organisms if it is prey of the other.
+		if rate == None and self.scheduler != None and self.paceFrames:
+			rate = self.scheduler.frameRate
+		with self.window.frame(rate):
+			worldSize = self.getWorldSize()
+			if worldSize != self.interface.worldSize:
+				self.resizeWindow(worldSize)
+			organismCount = len(sim)
+			if self.heatmap == None and organismCount > detailThreshold:
+				self.organismsDied(list(self.organismGraphics))
+			elif self.heatmap != None and organismCount < detailThreshold * .8:
+				self.heatmap.undraw()
+				self.heatmap = None
+
+			for graphic in self.deadGraphics:
+				graphic.undraw()
+			self.deadGraphics = []
+
+			if self.heatmap != None or organismCount > detailThreshold:
+				self.drawHeatmap(sim)
+			else:
+				# the screen coordinates of every circle that moved
+				# are computed in one batch
+				moves = ([], [], [])
+				for organism in sim.getOrganisms():
+					self.drawOrganism(organism, moves)
+				if moves[0]:
+					self.window.moveCirclesTo(*moves)
+
+	def drawHeatmap(self, sim):
+		'''
+		Draws the organisms of the simulation as a density
+		heatmap of the habitat (see raster.densityGrid) in a
+		single image, creating the image the first time.
 
 		Parameters:
-			organismsList: The list of organisms.
+			sim: The simulation to draw.
 
 		Return Value: none
 		'''
-		for organism in organismsList:
-			if organism != self: # prevents organism from checking if it's colliding with itself
-				if self.checkCollision(organism):
-					if self.isPrey(organism):
-						if eventLog:
-							print('Self killed organism')
-							self.hunger += 8
-						organism.die(organismsList)
-					elif organism.isPrey(self):
-						if eventLog:
-							print('Organism killed self')
-						organism.hunger += 8
-						self.die(organismsList)
-
-class simInterface:
+		import numpy
+		import raster
+
+		worldSize = self.getWorldSize()
+		if self.heatmap == None:
+			left, top = self.window.toScreen(-worldSize, worldSize)
+			right, bottom = self.window.toScreen(worldSize, -worldSize)
+			columns = max((right - left) // heatmapCellPixels, 1)
+			rows = max((bottom - top) // heatmapCellPixels, 1)
+			self.heatmap = Image(Point(0, 0), columns * heatmapCellPixels, rows * heatmapCellPixels)
+			self.heatmap.draw(self.window)
+			self.heatmapCells = (columns, rows)
+
+		columns, rows = self.heatmapCells
+		colors = raster.densityGrid(sim, columns, rows, (-worldSize, -worldSize, worldSize, worldSize))
+		hexDigits = numpy.array(['{:02x}'.format(value) for value in range(256)])
+		cellColors = numpy.char.add(numpy.char.add(numpy.char.add('#', hexDigits[colors[:, :, 0]]),
+												   hexDigits[colors[:, :, 1]]), hexDigits[colors[:, :, 2]])
+		pixelColors = cellColors.repeat(heatmapCellPixels, axis=0).repeat(heatmapCellPixels, axis=1)
+		self.heatmap.setPixels(pixelColors.tolist())
 
-	def __init__(self):
+	def spawnOrganismFromInput(self):
 		'''
-		Initializes the simulation window.
+		Spawns in randomly generated organisms at the location
+		of a mouse click. (Only works if the mouse click is in
+		the simulation window.) When ticks are being skipped
+		the mouse is only checked after a frame was drawn.
 		'''
-		# initialize window
-		self.win = GraphWin('Natural Selection Simulation', 700, 700)
-		# transform coordinates
-		self.win.setCoords(-100, -150, 100, 100)
+		if self.scheduler != None and not self.scheduler.lastFrameDrawn:
+			return
+		self.mousePos = self.window.checkMouse()
+		if self.mousePos != None:
+			self.spawnOrganismAt(self.mousePos.getX(), self.mousePos.getY())
 
-		self.lowerInterface = self.createLowerInterface()
-		self.lowerInterface.draw(self.win)
+	def getWorldSize(self):
+		'''
+		Returns the size of the habitat that is drawn: it spans
+		-size to size on both axes.
+		'''
+		if self.worldSize != None:
+			return self.worldSize
+		return sim_core.windowSize
 
-		self.organismCircle = None
+	def setWorldSize(self, worldSize):
+		'''
+		Sets the size of the habitat that is drawn, instead of
+		sim_core.windowSize.
+		'''
+		self.worldSize = worldSize
+		self.resizeWindow(worldSize)
 
-	def getWin(self):
+	def resizeWindow(self, worldSize):
 		'''
-		Returns the simulation window.
+		Transforms the window to show a habitat of the given size
+		(see simInterface.setWorldSize) and lays the information
+		in the lower interface out again at the new scale.
 		'''
-		return self.win
+		self.interface.setWorldSize(worldSize)
+		if self.informationShown != None:
+			self.displayInformation(*self.informationShown)
 
-	def createLowerInterface(self):
+	def spawnOrganismAt(self, x, y):
 		'''
-		Draws the interface at the bottom of the screen.
+		Spawns a randomly generated organism at a point if the
+		point is inside the habitat.
 		'''
-		interfaceRectangle = Rectangle(Point(-100, -100), Point(100, -150))
-		interfaceRectangle.setFill("gray")
-		return interfaceRectangle
+		worldSize = self.getWorldSize()
+		if abs(x) < worldSize and abs(y) < worldSize:
+			self.simulation.addOrganism(random.choice(('omnivore', 'herbivore', 'plant')), (x, y))
 
 	def close(self):
 		'''
-		Closes the graphical window.
+		Closes the simulation.
 		'''
-		self.win.close()
-
-class naturalSelectionSim:
+		self.simulation.detachViewer()
+		self.interface.close()
 
-	def __init__(self):
+	def update(self, ticks = None):
 		'''
-		Initializes the simulation window and interface.
+		Runs the simulation until it is over, one tick every
+		tickTime seconds, spawning organisms where the user
+		clicks. If frameRate is set only as many ticks are drawn
+		as fit into that many frames per second.
+
+		Parameters:
+			ticks (optional): Stop after this many ticks.
+
+		Return Value: The number of ticks that were run.
 		'''
-		self.interface = simInterface()
-		self.window = self.interface.getWin()
+		ticksRun = sim_core.runSimulation(self.simulation, ticks, timeBudget=timeBudget, tickTime=tickTime,
+										  beforeTick=self.spawnOrganismFromInput)
+		if self.scheduler != None and not self.scheduler.lastFrameDrawn:
+			# show the final tick even if it was skipped
+			self.drawFrame(self.simulation)
+		return ticksRun
 
-	def runSim(self):
+	def runSimThreaded(self):
 		'''
-		Runs the simulation from start to finish.
+		Runs the simulation from start to finish like runSim, but
+		with the ticks computed by a snapshot.simulationThread.
+		This thread only draws the latest snapshot published by
+		the simulation thread, frameRate times per second (30 if
+		frameRate is not set), and hands clicks over to it. An
+		exception raised by the simulation is raised again here.
 		'''
+		import snapshot
+
 		self.displayInformation()
 
 		self.waitForClick()
 
-		self.spawnOrganisms()
-
-		self.keepRunning = True
-		for i in range(gameTicks):
-			self.update()
+		self.simulation.spawnOrganisms()
+		self.simulation.detachViewer()
+		buffer = snapshot.snapshotBuffer()
+		thread = snapshot.simulationThread(self.simulation, buffer, timeBudget=timeBudget, tickTime=tickTime)
+
+		def clicked(point):
+			x, y = self.window.toWorld(point.getX(), point.getY())
+			thread.call(self.spawnOrganismAt, x, y)
+		self.window.setMouseHandler(clicked)
+
+		rate = frameRate if frameRate != None else 30
+		drawnSequence = 0
+		thread.start()
+		try:
+			while thread.is_alive():
+				sequence, latest = buffer.latest()
+				if sequence != drawnSequence:
+					self.drawSnapshot(latest, rate)
+					drawnSequence = sequence
+				else:
+					update(rate)
+		finally:
+			thread.stop()
+			self.window.setMouseHandler(None)
+			self.simulation.attachViewer(self)
+		thread.raiseError()
+
+		sequence, latest = buffer.latest()
+		if sequence != drawnSequence:
+			self.drawSnapshot(latest)
 
 		time.sleep(2)
 
 		# destroy all remaining organisms
-		for organism in self.organisms:
-			organism.die(self.organisms)
+		self.clearOrganisms()
 
-	def waitForClick(self):
-		'''
-		Displays a message on the screen and waits for user
-		input in order to continue.
+	def drawSnapshot(self, snapshot, rate = None):
 		'''
-		self.startText = Text(Point(0, 0), 'Click anywhere to begin the simulation.')
-		self.startText.setSize(20)
-		self.startText.draw(self.window)
-		self.window.getMouse()
-		self.startText.undraw()
-
-	def displayInformation(self):
-		'''
-		Displays information in the lower interface of simulation
-		window.
-		'''
-		self.informativeText_1 = Text(Point(0, -105), 'Click anywhere inside the habitat to spawn a new organism.')
-		self.informativeText_1.setSize(20)
-		self.informativeText_1.draw(self.window)
-
-		self.plantExample = Circle(Point(-90, -120), 3)
-		self.plantExample.setFill(color_rgb(10, 117, 31))
-		self.plantExample.draw(self.window)
-		self.plantTitle = Text(Point(-75, -120), '= Plant')
-		self.plantTitle.setSize(20)
-		self.plantTitle.draw(self.window)
+		Draws a snapshot.simulationSnapshot, undrawing the
+		organisms that are no longer in it.
 
-		self.herbivoreExample = Circle(Point(-90, -130), 3)
-		self.herbivoreExample.setFill('blue')
-		self.herbivoreExample.draw(self.window)
-		self.herbivoreTitle = Text(Point(-69, -130), '= Herbivore')
-		self.herbivoreTitle.setSize(20)
-		self.herbivoreTitle.draw(self.window)
+		Parameters:
+			snapshot: The snapshot to draw.
+			rate (optional): Passed on to drawFrame.
 
-		self.omnivoreExample = Circle(Point(-90, -140), 3)
-		self.omnivoreExample.setFill('orange')
-		self.omnivoreExample.draw(self.window)
-		self.omnivoreTitle = Text(Point(-69, -140), '= Omnivore')
-		self.omnivoreTitle.setSize(20)
-		self.omnivoreTitle.draw(self.window)
+		Return Value: none
+		'''
+		if self.organismGraphics:
+			keys = snapshot.keySet()
+			self.organismsDied([state for state in self.organismGraphics if state.key not in keys])
+		self.drawFrame(snapshot, rate)
 
-	def randomOrganism(self, organismType, position = None):
+	def watchSharedWorld(self, reader, rate = 30):
 		'''
-		Generates a random organism.
+		Draws a simulation running in another process, reading it
+		from shared memory, until it is over or the window is
+		closed. The simulation of this viewer is not used; the
+		habitat drawn is the one of the watched simulation.
 
 		Parameters:
-			organismType: The type of the new organism (Plant,
-						  herbivore, omnivore, carnivore)
-			position (optional): The starting position of the
-								 organism. Otherwise the start
-								 position is randomly generated.
+			reader: A shared_world.worldReader attached to the
+					segment the simulation is published to.
+			rate (optional): The largest number of frames drawn
+							 per second.
 
-		Return Value: A randomly generated organism object.
+		Return Value: none
 		'''
-		if position == None:
-			x = random.uniform(-(windowSize * .9), windowSize * .9)
-			y = random.uniform(-(windowSize * .9), windowSize * .9)
-		else:
-			x, y = position
-		size = random.uniform(1, 7)
-		speed = random.uniform(5, 10)
-		return organism(self.window, x, y, size, speed, organismType)
-
-	def spawnOrganisms(self):
-		'''
-		Spawns in randomly generated organisms by adding them
-		to a list of organisms.
-		'''
-		self.organisms = []
-		for i in range(7):
-			self.organisms.append(self.randomOrganism('omnivore'))
-		for i in range(5):
-			self.organisms.append(self.randomOrganism('herbivore'))
-		# BUG: Carnivores are not fully implemented yet.
-		# for i in range(5):
-		# 	self.organisms.append(self.randomOrganism('carnivore'))
-		for i in range(15):
-			self.organisms.append(self.randomOrganism('plant'))
+		import shared_world
+
+		self.simulation.detachViewer()
+		self.setWorldSize(reader.windowSize)
+		self.displayInformation('Watching a simulation running in another process.', legend=False)
+
+		drawnSequence = None
+		while not self.window.isClosed():
+			sequence = reader.getSequence()
+			if sequence != drawnSequence and sequence % 2 == 0:
+				drawnSequence, flags, windowSize, latest = reader.read()
+				if windowSize != self.worldSize:
+					self.setWorldSize(windowSize)
+				self.drawSnapshot(latest, rate)
+				if flags & shared_world.FINISHED:
+					break
+			else:
+				update(rate)
+
+	async def runSimAsync(self):
+		'''
+		Runs the simulation from start to finish like runSim, as
+		an asyncio coroutine. Ticks run as a task paced with
+		awaits instead of sleeps and clicks are handled by a
+		second task as soon as they arrive, so the window stays
+		responsive. The window's events must be handled by a
+		pumpEvents task running in the same event loop (see
+		runViewers). Frames are not paced with sleeps, which would
+		stop every task of the loop; the render scheduler alone
+		decides which ticks are drawn.
+		'''
+		clicks = asyncio.Queue()
+		self.window.setMouseHandler(clicks.put_nowait)
+		self.paceFrames = False
+		try:
+			self.displayInformation()
+
+			self.startText = Text(Point(0, 0), 'Click anywhere to begin the simulation.')
+			self.startText.setSize(20)
+			self.startText.draw(self.window)
+			await clicks.get()
+			self.startText.undraw()
+
+			self.simulation.spawnOrganisms()
+			self.drawSimulation(self.simulation)
+
+			inputTask = asyncio.ensure_future(self.handleClicks(clicks))
+			try:
+				await self.updateAsync()
+			finally:
+				inputTask.cancel()
+
+			await asyncio.sleep(2)
+		finally:
+			self.window.setMouseHandler(None)
+			self.paceFrames = True
 
-	def spawnOrganismFromInput(self):
-		'''
-		Spawns in randomly generated organisms at the location
-		of a mouse click. (Only works if the mouse click is in
-		the simulation window.)
-		'''
-		self.mousePos = self.window.checkMouse()
-		if self.mousePos != None:
-			if abs(self.mousePos.getX()) < windowSize and abs(self.mousePos.getY()) < windowSize:
-				self.organisms.append(self.randomOrganism(random.choice(('omnivore', 'herbivore', 'plant')), (self.mousePos.getX(), self.mousePos.getY())))
+		# destroy all remaining organisms
+		self.clearOrganisms()
 
-	def close(self):
+	async def handleClicks(self, clicks):
 		'''
-		Closes the simulation.
+		Spawns an organism for every click put into the queue by
+		the window's mouse handler, between ticks.
+
+		Parameters:
+			clicks: An asyncio.Queue of clicked points in window
+					(pixel) coordinates.
 		'''
-		self.interface.close()
+		while True:
+			point = await clicks.get()
+			x, y = self.window.toWorld(point.getX(), point.getY())
+			self.spawnOrganismAt(x, y)
 
-	def update(self):
+	async def updateAsync(self):
 		'''
-		Updates everything in the simulation every time
-		the function is called.
+		The asyncio version of update, without the polling of the
+		mouse (see handleClicks).
+
+		Return Value: The number of ticks that were run.
 		'''
-		while self.keepRunning:
-			self.livingOrganisms = 0
+		ticksRun = await sim_core.runSimulationAsync(self.simulation, timeBudget=timeBudget, tickTime=tickTime)
+		if self.scheduler != None and not self.scheduler.lastFrameDrawn:
+			# show the final tick even if it was skipped
+			self.drawFrame(self.simulation)
+		return ticksRun
 
-			self.spawnOrganismFromInput()
+async def pumpEvents(rate = None):
+	'''
+	Handles the events of every window (redraws, clicks and key
+	presses) rate times per second until cancelled.
+	'''
+	if rate == None:
+		rate = pumpRate
+	while True:
+		update()
+		await asyncio.sleep(1 / rate)
 
-			for organism in self.organisms:
-				if organism.getType() != 'plant':
-					self.livingOrganisms += 1
-					organism.update(self.organisms, self.window)
+async def runViewers(viewers):
+	'''
+	Runs the simulations of several viewers at the same time in
+	one event loop, with one task pumping the events of all of
+	their windows.
 
-			# generates new plants to sustain the organisms.
-			if random.randrange(10) > 2:
-				self.organisms.append(self.randomOrganism('plant'))
+	Parameters:
+		viewers: A list of naturalSelectionSim objects.
 
-			if self.livingOrganisms <= 1:
-				self.keepRunning = False
-				break
+	Return Value: none
+	'''
+	pump = asyncio.ensure_future(pumpEvents())
+	try:
+		await asyncio.gather(*(viewer.runSimAsync() for viewer in viewers))
+	finally:
+		pump.cancel()
 
-			time.sleep(tickTime)
+def runViewer(simulation):
+	'''
+	Runs the simulation of a viewer with the asyncio loop if
+	runAsync = True, in its own thread if threaded = True or
+	otherwise with runSim.
+	'''
+	if runAsync:
+		asyncio.run(runViewers([simulation]))
+	elif threaded:
+		simulation.runSimThreaded()
+	else:
+		simulation.runSim()
 
 def main():
 	'''
@@ -522,12 +724,12 @@ def main():
 	if loop:
 		for i in range(100):
 		    simulation = naturalSelectionSim()
-		    simulation.runSim()
+		    runViewer(simulation)
 		    simulation.close()
 		    time.sleep(1)
 	else:
 		simulation = naturalSelectionSim()
-		simulation.runSim()
+		runViewer(simulation)
 		simulation.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,878 @@
+'''
+population.py
+
+A struct-of-arrays store for large populations of organisms.
+Instead of one organism object per organism, the population keeps
+every trait (position, size, speed, hunger, type and whether the
+organism is alive) in contiguous NumPy arrays so that a whole game
+tick can be computed with vectorized operations. The rules are the
+same as the ones in sim_core.organism and the configuration is read
+from sim_core.
+'''
+
+import numpy
+import sim_core
+
+# organism type codes
+PLANT = 0
+HERBIVORE = 1
+OMNIVORE = 2
+CARNIVORE = 3
+
+typeNames = ('plant', 'herbivore', 'omnivore', 'carnivore')
+typeCodes = {'plant': PLANT, 'herbivore': HERBIVORE, 'omnivore': OMNIVORE, 'carnivore': CARNIVORE}
+
+# dietMatrix[predator, prey] is True if the predator type eats the
+# prey type (see organism.preyList)
+dietMatrix = numpy.zeros((4, 4), dtype=bool)
+dietMatrix[OMNIVORE, [PLANT, HERBIVORE, OMNIVORE, CARNIVORE]] = True
+dietMatrix[HERBIVORE, PLANT] = True
+dietMatrix[CARNIVORE, [HERBIVORE, OMNIVORE, CARNIVORE]] = True
+
+# below this many movers times living organisms the nearest prey
+# is found faster by nearestPreyExhaustive than with a cellGrid
+exhaustiveSearchLimit = 1 << 17
+
+def isPreyOf(predatorType, predatorSize, preyType, preySize):
+	'''
+	The vectorized version of organism.isPrey. All of the
+	parameters are arrays (or scalars) that broadcast together.
+
+	Parameters:
+		predatorType, predatorSize: The type codes and sizes
+									of the predators.
+		preyType, preySize: The type codes and sizes of the
+							possible prey.
+
+	Return Value:
+		A boolean array that is True where the prey is prey
+		for the predator.
+	'''
+	return dietMatrix[predatorType, preyType] & ((preyType == PLANT) | (preySize < predatorSize))
+
+_ringOffsetCache = {}
+
+def ringOffsets(radius):
+	'''
+	Returns two arrays holding the column and row offsets of the
+	cells that are exactly radius cells away from a cell.
+	'''
+	if radius not in _ringOffsetCache:
+		if radius == 0:
+			columns = numpy.zeros(1, dtype=int)
+			rows = numpy.zeros(1, dtype=int)
+		else:
+			side = numpy.arange(-radius, radius + 1)
+			inner = numpy.arange(-radius + 1, radius)
+			columns = numpy.concatenate((side, side, numpy.full(len(inner), -radius), numpy.full(len(inner), radius)))
+			rows = numpy.concatenate((numpy.full(len(side), -radius), numpy.full(len(side), radius), inner, inner))
+		_ringOffsetCache[radius] = (columns, rows)
+	return _ringOffsetCache[radius]
+
+class cellGrid:
+	'''
+	A uniform grid over the living organisms of a population.
+	The organism indices are sorted by cell so the organisms in
+	any cell are a contiguous slice, which lets whole batches of
+	cell queries be answered with array operations.
+	'''
+
+	def __init__(self, population, indices = None, cellSize = None, minCellSize = 1, occupancy = 2):
+		'''
+		Builds the grid.
+
+		Parameters:
+			population: The population to index.
+			indices (optional): The organisms to put in the grid.
+								Defaults to every living organism.
+			cellSize (optional): The width of a cell. Otherwise it
+								 is picked so there are about
+								 occupancy organisms per cell, which
+								 keeps the number of cells
+								 proportional to the number of
+								 organisms however far apart they
+								 are.
+			minCellSize (optional): The smallest width of a picked
+									cell.
+			occupancy (optional): The average number of organisms
+								  per cell of a picked cell width.
+		'''
+		if indices is None:
+			indices = numpy.flatnonzero(population.alive[:population.count])
+		self.population = population
+		self.count = len(indices)
+
+		pos = population.pos[indices]
+		if self.count:
+			low = pos.min(axis=0)
+			high = pos.max(axis=0)
+		else:
+			low = high = numpy.zeros(2)
+		if cellSize == None:
+			width, height = high - low
+			number = max(self.count, 1)
+			# the second bound keeps a long, thin spread of organisms
+			# from needing more cells than organisms along its length
+			cellSize = max(numpy.sqrt(occupancy * width * height / number), occupancy * max(width, height) / number, minCellSize)
+		self.cellSize = float(cellSize)
+		self.origin = low
+		self.columns = int((high[0] - low[0]) // self.cellSize) + 1
+		self.rows = int((high[1] - low[1]) // self.cellSize) + 1
+
+		columns, rows = self.cellOf(pos[:, 0], pos[:, 1])
+		cells = rows * self.columns + columns
+		order = numpy.argsort(cells, kind='stable')
+		self.indices = indices[order]
+		self.cells = cells[order]
+		self.cellStart = numpy.zeros(self.columns * self.rows + 1, dtype=int)
+		numpy.cumsum(numpy.bincount(cells, minlength=self.columns * self.rows), out=self.cellStart[1:])
+
+	def cellOf(self, x, y):
+		'''
+		Returns arrays of the columns and rows of the cells
+		containing the points, clipped to the grid.
+		'''
+		columns = numpy.clip(((x - self.origin[0]) // self.cellSize).astype(int), 0, self.columns - 1)
+		rows = numpy.clip(((y - self.origin[1]) // self.cellSize).astype(int), 0, self.rows - 1)
+		return columns, rows
+
+	def maxRadius(self):
+		'''
+		Returns the largest ring radius that can contain a cell.
+		'''
+		return max(self.columns, self.rows) - 1
+
+	def query(self, columns, rows, offsetColumns, offsetRows):
+		'''
+		Lists the organisms in the cells at the given offsets
+		from each query cell.
+
+		Parameters:
+			columns, rows: The cells to query from.
+			offsetColumns, offsetRows: The offsets of the cells
+									   to look in.
+
+		Return Value:
+			A tuple (owners, slots) of index arrays; owners holds
+			the position in columns/rows of the query each found
+			organism belongs to, and slots holds the position of
+			the found organism in grid.indices.
+		'''
+		cellColumns = columns[:, None] + offsetColumns
+		cellRows = rows[:, None] + offsetRows
+		inside = (cellColumns >= 0) & (cellColumns < self.columns) & (cellRows >= 0) & (cellRows < self.rows)
+		owners = numpy.nonzero(inside)[0]
+		cells = cellRows[inside] * self.columns + cellColumns[inside]
+
+		starts = self.cellStart[cells]
+		counts = self.cellStart[cells + 1] - starts
+		total = counts.sum()
+		owners = numpy.repeat(owners, counts)
+		# position of every found organism inside its cell's slice
+		firsts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+		slots = numpy.repeat(starts, counts) + numpy.arange(total) - firsts
+		return owners, slots
+
+	def candidatePairs(self, reach):
+		'''
+		Broad phase collision detection. Enumerates every pair of
+		organisms in the grid whose cells are close enough that
+		the organisms could be within reach of each other on both
+		axes. Each pair is listed once.
+
+		Parameters:
+			reach: The largest distance (on either axis) at which
+				   two organisms can collide.
+
+		Return Value:
+			A tuple (first, second) of population index arrays.
+		'''
+		span = max(1, int(numpy.ceil(reach / self.cellSize)))
+		# only look "forward" so every pair of cells is visited once
+		offsetColumns, offsetRows = numpy.meshgrid(numpy.arange(-span, span + 1), numpy.arange(0, span + 1), indexing='ij')
+		forward = (offsetRows > 0) | (offsetColumns >= 0)
+		offsetColumns = offsetColumns[forward]
+		offsetRows = offsetRows[forward]
+
+		columns = self.cells % self.columns
+		rows = self.cells // self.columns
+		owners, slots = self.query(columns, rows, offsetColumns, offsetRows)
+		# within the same cell only keep each pair once
+		keep = (self.cells[owners] != self.cells[slots]) | (slots > owners)
+		return self.indices[owners[keep]], self.indices[slots[keep]]
+
+def nearestPrey(population, movers = None, grid = None):
+	'''
+	Finds the nearest valid prey of every moving organism in a
+	single call. Distances are measured the same way as
+	organism.distanceFromTarget and prey is decided by the same
+	rules as organism.isPrey. All of the movers search a cellGrid
+	together, widening their search one ring of cells at a time
+	until no unsearched cell could hold anything closer than the
+	prey they have already found.
+
+	Parameters:
+		population: The population to search.
+		movers (optional): The indices of the organisms to find
+						   prey for. Defaults to every living
+						   non-plant organism.
+		grid (optional): A cellGrid of the living organisms.
+						 Built if not given.
+
+	Return Value:
+		A tuple (movers, targets) of index arrays. targets holds
+		the index of the nearest prey of each mover, or -1 if the
+		mover has no prey.
+	'''
+	if movers is None:
+		movers = population.movers()
+	movers = numpy.asarray(movers)
+	targets = numpy.full(len(movers), -1)
+	if grid is None:
+		grid = cellGrid(population)
+	if grid.count == 0:
+		return movers, targets
+
+	closest = numpy.full(len(movers), numpy.inf)
+	pos = population.pos
+	size = population.size
+	typeCode = population.typeCode
+	columns, rows = grid.cellOf(pos[movers, 0], pos[movers, 1])
+
+	pending = numpy.arange(len(movers))
+	for radius in range(grid.maxRadius() + 1):
+		offsetColumns, offsetRows = ringOffsets(radius)
+		owners, slots = grid.query(columns[pending], rows[pending], offsetColumns, offsetRows)
+		owners = pending[owners]
+		candidates = grid.indices[slots]
+		predators = movers[owners]
+
+		valid = isPreyOf(typeCode[predators], size[predators], typeCode[candidates], size[candidates])
+		owners = owners[valid]
+		predators = predators[valid]
+		candidates = candidates[valid]
+		distances = numpy.abs(pos[candidates, 0] - pos[predators, 0]) + numpy.abs(pos[candidates, 1] - pos[predators, 1])
+
+		# keep the closest candidate of each mover
+		order = numpy.lexsort((candidates, distances, owners))
+		owners = owners[order]
+		first = numpy.ones(len(owners), dtype=bool)
+		first[1:] = owners[1:] != owners[:-1]
+		owners = owners[first]
+		candidates = candidates[order][first]
+		distances = distances[order][first]
+
+		better = distances < closest[owners]
+		closest[owners[better]] = distances[better]
+		targets[owners[better]] = candidates[better]
+
+		pending = pending[closest[pending] > radius * grid.cellSize]
+		if len(pending) == 0:
+			break
+
+	return movers, targets
+
+def nearestPreyExhaustive(population, movers = None, chunkElements = 1 << 22):
+	'''
+	Finds the nearest valid prey of every moving organism by
+	comparing it against every candidate. Distances are measured the same way as
+	organism.distanceFromTarget and prey is decided by the same
+	rules as organism.isPrey. Each predator type is only compared
+	against the types it eats, and the movers are processed in
+	chunks so the distance matrix never holds more than
+	chunkElements values. This is faster than nearestPrey for
+	small populations (see exhaustiveSearchLimit).
+
+	Parameters:
+		population: The population to search.
+		movers (optional): The indices of the organisms to find
+						   prey for. Defaults to every living
+						   non-plant organism.
+		chunkElements (optional): The largest distance matrix to
+								  build at once.
+
+	Return Value:
+		A tuple (movers, targets) of index arrays. targets holds
+		the index of the nearest prey of each mover, or -1 if the
+		mover has no prey.
+	'''
+	if movers is None:
+		movers = population.movers()
+	movers = numpy.asarray(movers)
+	targets = numpy.full(len(movers), -1)
+
+	count = population.count
+	alive = population.alive[:count]
+	typeCode = population.typeCode[:count]
+	moverTypes = typeCode[movers]
+
+	for predatorType in numpy.unique(moverTypes):
+		candidates = numpy.flatnonzero(alive & dietMatrix[predatorType, typeCode])
+		if len(candidates) == 0:
+			continue
+		candidateX = population.pos[candidates, 0]
+		candidateY = population.pos[candidates, 1]
+		candidateSize = population.size[candidates]
+		candidatePlant = typeCode[candidates] == PLANT
+
+		predators = numpy.flatnonzero(moverTypes == predatorType)
+		chunkSize = max(1, chunkElements // len(candidates))
+		for start in range(0, len(predators), chunkSize):
+			chunk = predators[start:start + chunkSize]
+			indices = movers[chunk]
+			distances = (numpy.abs(population.pos[indices, 0, None] - candidateX) +
+						 numpy.abs(population.pos[indices, 1, None] - candidateY))
+			tooBig = ~candidatePlant & (candidateSize >= population.size[indices, None])
+			distances[tooBig] = numpy.inf
+
+			nearest = numpy.argmin(distances, axis=1)
+			found = numpy.isfinite(distances[numpy.arange(len(chunk)), nearest])
+			targets[chunk[found]] = candidates[nearest[found]]
+
+	return movers, targets
+
+class organismView:
+	'''
+	A thin view onto a single row of a population. It offers
+	the same read methods as sim_core.organism so code written
+	against organism objects keeps working. Views compare equal
+	when they refer to the same organism, but a view's index is
+	only valid until the population is next compacted.
+	'''
+
+	def __init__(self, population, index):
+		'''
+		Initializes the view.
+
+		Parameters:
+			population: The population the organism belongs to.
+			index: The row of the organism in the population.
+		'''
+		self.population = population
+		self.index = index
+		self.id = int(population.ids[index])
+
+	def __eq__(self, other):
+		return isinstance(other, organismView) and other.population is self.population and other.id == self.id
+
+	def __hash__(self):
+		return hash(self.id)
+
+	def getId(self):
+		'''
+		Returns the id of the organism. Unlike its index, the id
+		of an organism never changes when the population is
+		compacted.
+		'''
+		return self.id
+
+	def getPos(self):
+		'''
+		Returns the position of the organism as a NumPy view
+		containing two values [x, y].
+		'''
+		return self.population.pos[self.index]
+
+	def getSize(self):
+		'''
+		Returns the size of the organism as a float value.
+		'''
+		return float(self.population.size[self.index])
+
+	def getSpeed(self):
+		'''
+		Returns the speed of the organism as a float value.
+		'''
+		return float(self.population.speed[self.index])
+
+	def getHunger(self):
+		'''
+		Returns the hunger of the organism as a float value.
+		'''
+		return float(self.population.hunger[self.index])
+
+	def getType(self):
+		'''
+		Returns the type of the organism as a string value.
+		'''
+		return typeNames[self.population.typeCode[self.index]]
+
+	def isAlive(self):
+		'''
+		Returns True if the organism is still alive.
+		'''
+		return bool(self.population.alive[self.index])
+
+	def isPrey(self, target):
+		'''
+		Given a target organism view, checks if the target is
+		prey for this organism.
+		'''
+		population = self.population
+		return bool(isPreyOf(population.typeCode[self.index], population.size[self.index],
+							 typeCodes[target.getType()], target.getSize()))
+
+class population:
+	'''
+	This class stores a population of organisms as parallel
+	NumPy arrays and advances the whole population one game
+	tick at a time.
+	'''
+
+	arrayNames = ('pos', 'size', 'speed', 'hunger', 'typeCode', 'alive', 'ids')
+
+	def __init__(self, capacity = 1024, seed = None):
+		'''
+		Initializes an empty population.
+
+		Parameters:
+			capacity (optional): The number of rows to preallocate.
+								 The arrays grow when it runs out.
+			seed (optional): The seed for the random number
+							 generator of the population.
+		'''
+		self.count = 0
+		self.pos = numpy.zeros((capacity, 2))
+		self.size = numpy.zeros(capacity)
+		self.speed = numpy.zeros(capacity)
+		self.hunger = numpy.zeros(capacity)
+		self.typeCode = numpy.zeros(capacity, dtype=numpy.int8)
+		self.alive = numpy.zeros(capacity, dtype=bool)
+		self.ids = numpy.zeros(capacity, dtype=numpy.int64)
+		self.nextId = 0
+		self.rng = numpy.random.default_rng(seed)
+		self.viewer = None
+		self.profiler = None
+		self.events = sim_core.defaultEventLog()
+		self.tick = 0
+		self.livingOrganisms = 0
+		self.resetCounters()
+		self.currentMovers = numpy.zeros(0, dtype=int)
+		self.currentTargets = numpy.zeros(0, dtype=int)
+
+	def __len__(self):
+		return int(self.alive[:self.count].sum())
+
+	def reserve(self, capacity):
+		'''
+		Makes sure the arrays can hold at least capacity rows.
+		'''
+		oldCapacity = len(self.size)
+		if capacity <= oldCapacity:
+			return
+		newCapacity = max(capacity, oldCapacity * 2)
+		for name in self.arrayNames:
+			oldArray = getattr(self, name)
+			newArray = numpy.zeros((newCapacity,) + oldArray.shape[1:], dtype=oldArray.dtype)
+			newArray[:self.count] = oldArray[:self.count]
+			setattr(self, name, newArray)
+
+	def add(self, x, y, size, speed, organismType):
+		'''
+		Adds organisms to the population. Every parameter may
+		be a scalar or an array, as long as they broadcast to
+		the same length.
+
+		Parameters:
+			x, y: The starting coordinates of the organisms.
+			size: The sizes of the organisms.
+			speed: The speeds of the organisms.
+			organismType: The type name of the organisms.
+
+		Return Value: The indices of the new organisms.
+		'''
+		x, y, size, speed = numpy.broadcast_arrays(*(numpy.atleast_1d(numpy.asarray(value, dtype=float))
+													 for value in (x, y, size, speed)))
+		number = len(x)
+		start = self.count
+		end = start + number
+		self.reserve(end)
+
+		self.pos[start:end, 0] = x
+		self.pos[start:end, 1] = y
+		self.size[start:end] = size
+		self.speed[start:end] = speed
+		self.hunger[start:end] = 50
+		self.typeCode[start:end] = typeCodes[organismType]
+		self.alive[start:end] = True
+		self.ids[start:end] = numpy.arange(self.nextId, self.nextId + number)
+		self.nextId += number
+		self.count = end
+		return numpy.arange(start, end)
+
+	def addRandom(self, organismType, number = 1, position = None):
+		'''
+		Adds randomly generated organisms using the same ranges
+		as simulation.randomOrganism.
+
+		Parameters:
+			organismType: The type of the new organisms.
+			number (optional): How many organisms to add.
+			position (optional): The starting position of the
+								 organisms. Otherwise the start
+								 positions are randomly generated.
+
+		Return Value: The indices of the new organisms.
+		'''
+		if position == None:
+			limit = sim_core.windowSize * .9
+			x = self.rng.uniform(-limit, limit, number)
+			y = self.rng.uniform(-limit, limit, number)
+		else:
+			x, y = position
+		size = self.rng.uniform(sim_core.minSize, sim_core.maxSize, number)
+		speed = self.rng.uniform(sim_core.minSpeed, sim_core.maxSpeed, number)
+		return self.add(x, y, size, speed, organismType)
+
+	def addOrganism(self, organismType, position = None):
+		'''
+		Adds a single randomly generated organism, like
+		simulation.addOrganism.
+
+		Parameters:
+			organismType: The type of the new organism.
+			position (optional): The starting position of the
+								 organism. Otherwise the start
+								 position is randomly generated.
+
+		Return Value: An organismView of the new organism.
+		'''
+		return self.organism(int(self.addRandom(organismType, 1, position)[0]))
+
+	def spawnOrganisms(self):
+		'''
+		Spawns in the same starting population as
+		simulation.spawnOrganisms.
+		'''
+		self.addRandom('omnivore', sim_core.omnivoreCount)
+		self.addRandom('herbivore', sim_core.herbivoreCount)
+		self.addRandom('carnivore', sim_core.carnivoreCount)
+		self.addRandom('plant', sim_core.plantCount)
+
+	def attachViewer(self, viewer):
+		'''
+		Attaches a viewer to the population. It is notified the
+		same way as a viewer attached to a sim_core.simulation,
+		with organismView objects standing in for organisms.
+		'''
+		self.viewer = viewer
+
+	def detachViewer(self):
+		'''
+		Detaches the current viewer (if any) from the population.
+		'''
+		self.viewer = None
+
+	def attachProfiler(self, profiler):
+		'''
+		Attaches a tickProfiler (see profiler.py) that runs and
+		times every phase of the following ticks.
+		'''
+		self.profiler = profiler
+
+	def detachProfiler(self):
+		'''
+		Detaches the current profiler (if any).
+		'''
+		self.profiler = None
+
+	def attachEventLog(self, log):
+		'''
+		Attaches an events.eventLog that records every kill and
+		starvation of the following ticks.
+		'''
+		self.events = log
+
+	def detachEventLog(self):
+		'''
+		Detaches the current event log (if any).
+		'''
+		self.events = None
+
+	def resetCounters(self):
+		'''
+		Resets the counts of what happened during the tick.
+		'''
+		self.kills = 0
+		self.starvations = 0
+		self.plantsSpawned = 0
+		self.deaths = 0
+		self.dead = []
+
+	def getOrganisms(self):
+		'''
+		Returns a list of views onto every living organism.
+		'''
+		return self.organisms()
+
+	def compact(self):
+		'''
+		Removes the rows of every dead organism in a single pass,
+		moving the living organisms to the front of the arrays
+		while keeping their order.
+
+		Return Value: The ids of the organisms that were removed.
+		'''
+		count = self.count
+		living = self.alive[:count]
+		dead = self.ids[:count][~living]
+		if len(dead):
+			keep = numpy.flatnonzero(living)
+			number = len(keep)
+			for name in self.arrayNames:
+				array = getattr(self, name)
+				array[:number] = array[keep]
+			self.alive[number:count] = False
+			self.count = number
+		return dead
+
+	def organism(self, index):
+		'''
+		Returns an organismView onto the given row.
+		'''
+		return organismView(self, index)
+
+	def organisms(self):
+		'''
+		Returns a list of views onto every living organism.
+		'''
+		return [organismView(self, index) for index in numpy.flatnonzero(self.alive[:self.count])]
+
+	def movers(self):
+		'''
+		Returns the indices of the living non-plant organisms.
+		'''
+		count = self.count
+		return numpy.flatnonzero(self.alive[:count] & (self.typeCode[:count] != PLANT))
+
+	def moveToTargets(self, movers, targets):
+		'''
+		The vectorized version of organism.moveToTarget.
+
+		Parameters:
+			movers: The indices of the moving organisms.
+			targets: The index of the target of each mover.
+
+		Return Value: none
+		'''
+		velocity = self.speed[movers] * sim_core.speedFactor
+		distance = self.pos[targets] - self.pos[movers]
+
+		velocityX = numpy.where(distance[:, 0] >= 0, velocity, -velocity)
+		velocityX = numpy.where(numpy.abs(distance[:, 0]) < velocity, distance[:, 0], velocityX)
+
+		# organism.moveToTarget only shortens the y step when the
+		# target is below the organism
+		velocityY = numpy.where(distance[:, 1] >= 0, velocity, -velocity)
+		velocityY = numpy.where((distance[:, 1] < 0) & (numpy.abs(distance[:, 1]) < velocity),
+								distance[:, 1], velocityY)
+
+		self.pos[movers, 0] += velocityX
+		self.pos[movers, 1] += velocityY
+
+	def moveRandom(self, movers):
+		'''
+		The vectorized version of organism.moveRandom.
+		'''
+		speed = self.speed[movers, None]
+		self.pos[movers] += self.rng.uniform(-speed, speed, (len(movers), 2)) * sim_core.speedFactor
+
+	def stayInScreen(self, movers):
+		'''
+		The vectorized version of organism.stayInScreen. Just like
+		the original, only the first of the four edge checks that
+		fails is corrected each tick.
+		'''
+		limit = sim_core.windowSize
+		x = self.pos[movers, 0]
+		y = self.pos[movers, 1]
+		size = self.size[movers]
+
+		right = x + size >= limit
+		left = ~right & (x - size <= -limit)
+		top = ~right & ~left & (y + size >= limit)
+		bottom = ~right & ~left & ~top & (y - size <= -limit)
+
+		x[right] = limit - size[right]
+		x[left] = -limit + size[left]
+		y[top] = limit - size[top]
+		y[bottom] = -limit + size[bottom]
+		self.pos[movers, 0] = x
+		self.pos[movers, 1] = y
+
+	def collisionPairs(self):
+		'''
+		Finds every pair of living organisms that collide, using
+		a cellGrid as the broad phase and the bounding box test
+		of organism.isCollidingWith as the narrow phase. Pairs of
+		plants are left out since plants never eat.
+
+		Return Value:
+			A tuple (first, second) of index arrays.
+		'''
+		living = numpy.flatnonzero(self.alive[:self.count])
+		if len(living) < 2:
+			return numpy.zeros(0, dtype=int), numpy.zeros(0, dtype=int)
+		reach = self.size[living].max()
+		# cells as narrow as the reach, unless that would make far
+		# more cells than organisms
+		grid = cellGrid(self, living, minCellSize=reach, occupancy=.25)
+		first, second = grid.candidatePairs(reach)
+
+		notPlants = (self.typeCode[first] != PLANT) | (self.typeCode[second] != PLANT)
+		first = first[notPlants]
+		second = second[notPlants]
+		distanceX = numpy.abs(self.pos[first, 0] - self.pos[second, 0])
+		distanceY = numpy.abs(self.pos[first, 1] - self.pos[second, 1])
+		firstSize = self.size[first]
+		secondSize = self.size[second]
+		colliding = (((distanceX <= firstSize) & (distanceY <= firstSize)) |
+					 ((distanceX <= secondSize) & (distanceY <= secondSize)))
+		return first[colliding], second[colliding]
+
+	def resolveCollisions(self):
+		'''
+		Lets the predator of every colliding pair eat the prey.
+		The meals are decided with array operations; only the
+		pairs that end in a meal are then applied one by one so
+		an organism that has just been eaten cannot eat or be
+		eaten again.
+
+		Return Value:
+			A tuple (predators, victims) of index arrays.
+		'''
+		first, second = self.collisionPairs()
+		typeCode = self.typeCode
+		size = self.size
+		firstEats = isPreyOf(typeCode[first], size[first], typeCode[second], size[second])
+		secondEats = ~firstEats & isPreyOf(typeCode[second], size[second], typeCode[first], size[first])
+		meals = firstEats | secondEats
+		predators = numpy.where(firstEats, first, second)[meals]
+		victims = numpy.where(firstEats, second, first)[meals]
+
+		alive = self.alive
+		eaten = numpy.zeros(len(predators), dtype=bool)
+		for meal, (predator, victim) in enumerate(zip(predators.tolist(), victims.tolist())):
+			if alive[predator] and alive[victim]:
+				alive[victim] = False
+				self.hunger[predator] += 8
+				eaten[meal] = True
+		predators = predators[eaten]
+		victims = victims[eaten]
+		self.kills += len(victims)
+		if self.events != None and len(victims):
+			self.events.recordKills(self.tick + 1, self.ids[predators], self.ids[victims], size[predators], size[victims],
+									self.pos[victims, 0], self.pos[victims, 1])
+		return predators, victims
+
+	def starve(self, movers):
+		'''
+		Makes the movers hungrier and kills the ones that have
+		starved.
+		'''
+		self.hunger[movers] -= 0.5
+		starved = movers[self.hunger[movers] <= 0]
+		self.alive[starved] = False
+		return starved
+
+	def findTargets(self):
+		'''
+		The first phase of a tick. Finds the nearest prey of every
+		living non-plant organism.
+		'''
+		self.resetCounters()
+		movers = self.movers()
+		self.livingOrganisms = len(movers)
+		if len(movers) * len(self) < exhaustiveSearchLimit:
+			self.currentMovers, self.currentTargets = nearestPreyExhaustive(self, movers)
+		else:
+			self.currentMovers, self.currentTargets = nearestPrey(self, movers, cellGrid(self))
+
+	def moveOrganisms(self):
+		'''
+		Moves every organism that looked for prey this tick.
+		'''
+		movers = self.currentMovers
+		targets = self.currentTargets
+		chasing = targets >= 0
+		self.moveToTargets(movers[chasing], targets[chasing])
+		self.moveRandom(movers[~chasing])
+		self.stayInScreen(movers)
+
+	def starveOrganisms(self):
+		'''
+		Makes every organism that moved this tick hungrier.
+		'''
+		movers = self.currentMovers
+		starved = self.starve(movers[self.alive[movers]])
+		self.starvations += len(starved)
+		if self.events != None and len(starved):
+			self.events.recordStarvations(self.tick + 1, self.ids[starved], self.size[starved],
+										  self.pos[starved, 0], self.pos[starved, 1])
+		return starved
+
+	def spawnPlants(self):
+		'''
+		Generates new plants to sustain the organisms.
+		'''
+		if self.rng.random() < sim_core.plantSpawnChance:
+			self.addRandom('plant')
+			self.plantsSpawned += 1
+
+	def endTick(self):
+		'''
+		Removes the organisms that died this tick and moves on
+		to the next tick.
+
+		Return Value:
+			A list of views of the organisms that died if a viewer
+			is attached; else an empty list.
+		'''
+		self.dead = []
+		if self.viewer != None:
+			self.dead = [organismView(self, index) for index in numpy.flatnonzero(~self.alive[:self.count])]
+		self.deaths = len(self.compact())
+		self.tick += 1
+		return self.dead
+
+	def render(self, dead = None):
+		'''
+		Lets the attached viewer (if any) draw the population.
+
+		Parameters:
+			dead (optional): The views returned by endTick.
+							 Defaults to the ones from the last
+							 endTick.
+
+		Return Value: none
+		'''
+		if dead is None:
+			dead = self.dead
+		if self.viewer != None:
+			if dead:
+				self.viewer.organismsDied(dead)
+			self.viewer.drawSimulation(self)
+
+	def update(self):
+		'''
+		Advances the whole population by a single game tick.
+
+		Return Value:
+			True if more than one non-plant organism was alive
+			during the tick; else False.
+		'''
+		if self.profiler != None:
+			self.profiler.runTick(self)
+			return self.livingOrganisms > 1
+
+		self.findTargets()
+		self.moveOrganisms()
+		self.resolveCollisions()
+		self.starveOrganisms()
+		self.spawnPlants()
+
+		# the dead are only removed once the tick is over
+		self.endTick()
+		self.render()
+
+		return self.livingOrganisms > 1
@@ -0,0 +1,150 @@
+'''
+profiler.py
+
+Built-in instrumentation for the simulation loop. A tickProfiler
+attached to a simulation (or population) runs every phase of each
+tick itself (see sim_core.tickPhases), timing the phases, counting
+kills, starvations, deaths and plant spawns, and calling any hooks
+registered before or after a phase. The totals can be read at any
+time with summary() and can be printed every few ticks.
+
+    sim = sim_core.simulation()
+    profiler = tickProfiler(summaryInterval = 50)
+    sim.attachProfiler(profiler)
+'''
+
+import sys
+import time
+import sim_core
+
+counterNames = ('organisms', 'kills', 'starvations', 'deaths', 'plantsSpawned')
+
+class tickProfiler:
+	'''
+	This class times the phases of every tick of the simulation
+	it is attached to and keeps running totals of them.
+	'''
+
+	def __init__(self, summaryInterval = None, report = None):
+		'''
+		Initializes the profiler with empty totals.
+
+		Parameters:
+			summaryInterval (optional): Report a summary every this
+										many ticks.
+			report (optional): The function called with the summary
+							   text. Defaults to printing it to
+							   standard error.
+		'''
+		self.summaryInterval = summaryInterval
+		self.report = report
+		self.beforeHooks = {}
+		self.afterHooks = {}
+		self.reset()
+
+	def reset(self):
+		'''
+		Clears all timers and counters.
+		'''
+		self.ticks = 0
+		self.phaseTotals = dict.fromkeys((name for name, method in sim_core.tickPhases), 0.0)
+		self.lastTick = dict.fromkeys(self.phaseTotals, 0.0)
+		self.counterTotals = dict.fromkeys(counterNames, 0)
+		self.lastCounters = dict.fromkeys(counterNames, 0)
+
+	def addHook(self, when, phase, callback):
+		'''
+		Registers a function to be called around a phase.
+
+		Parameters:
+			when: 'before' or 'after'.
+			phase: The name of the phase (see sim_core.tickPhases).
+			callback: Called as callback(sim, phase) before the
+					  phase or as callback(sim, phase, seconds)
+					  after it.
+
+		Return Value: none
+		'''
+		self.hookList(when, phase).append(callback)
+
+	def removeHook(self, when, phase, callback):
+		'''
+		Unregisters a function added with addHook.
+		'''
+		self.hookList(when, phase).remove(callback)
+
+	def hookList(self, when, phase):
+		'''
+		Returns the list of hooks called at the given time of the
+		given phase.
+		'''
+		if phase not in self.phaseTotals:
+			raise ValueError('unknown phase: {}'.format(phase))
+		if when == 'before':
+			return self.beforeHooks.setdefault(phase, [])
+		elif when == 'after':
+			return self.afterHooks.setdefault(phase, [])
+		raise ValueError("when must be 'before' or 'after'")
+
+	def runTick(self, sim):
+		'''
+		Runs one tick of the simulation, phase by phase, timing
+		each phase and calling its hooks.
+
+		Parameters:
+			sim: The simulation to advance.
+
+		Return Value: none
+		'''
+		clock = time.perf_counter
+		for phase, method in sim_core.tickPhases:
+			for callback in self.beforeHooks.get(phase, ()):
+				callback(sim, phase)
+			start = clock()
+			getattr(sim, method)()
+			seconds = clock() - start
+			self.lastTick[phase] = seconds
+			self.phaseTotals[phase] += seconds
+			for callback in self.afterHooks.get(phase, ()):
+				callback(sim, phase, seconds)
+
+		self.lastCounters = {'organisms': sim.livingOrganisms, 'kills': sim.kills, 'starvations': sim.starvations,
+							 'deaths': sim.deaths, 'plantsSpawned': sim.plantsSpawned}
+		for name, value in self.lastCounters.items():
+			self.counterTotals[name] += value
+		self.ticks += 1
+
+		if self.summaryInterval and self.ticks % self.summaryInterval == 0:
+			text = formatSummary(self.summary())
+			if self.report != None:
+				self.report(text)
+			else:
+				print(text, file=sys.stderr)
+
+	def summary(self):
+		'''
+		Returns a dictionary summarizing every tick profiled so
+		far: the number of ticks, the total and mean seconds of
+		each phase, the share of the tick each phase took, the
+		counter totals and the timings and counters of the last
+		tick.
+		'''
+		ticks = max(self.ticks, 1)
+		total = sum(self.phaseTotals.values())
+		phases = {}
+		for phase, seconds in self.phaseTotals.items():
+			phases[phase] = {'total': seconds, 'mean': seconds / ticks,
+							 'share': seconds / total if total else 0.0}
+		return {'ticks': self.ticks, 'seconds': total, 'phases': phases,
+				'counters': dict(self.counterTotals), 'lastTick': dict(self.lastTick),
+				'lastCounters': dict(self.lastCounters)}
+
+def formatSummary(summary):
+	'''
+	Formats a summary returned by tickProfiler.summary as a table.
+	'''
+	lines = ['{} ticks in {:.3f} s'.format(summary['ticks'], summary['seconds'])]
+	for phase, timing in summary['phases'].items():
+		lines.append('  {:<16}{:>10.3f} ms/tick {:>6.1%}'.format(phase, timing['mean'] * 1000, timing['share']))
+	lines.append('  ' + ', '.join('{} {}'.format(name, value) for name, value in summary['counters'].items()))
+	return '\n'.join(lines)
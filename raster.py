@@ -0,0 +1,330 @@
+'''
+raster.py
+
+An offscreen renderer for machines without a display. A
+frameBuffer draws the living organisms of a simulation (or a
+population.population) as colored discs into a NumPy RGB image,
+stamping every disc of the same size at once instead of setting
+pixels one at a time, and writes the image as a PPM or PNG file. A
+rasterViewer attached to a simulation writes a numbered image
+sequence as the simulation runs, which can be turned into a video
+with a tool such as ffmpeg.
+
+Run from the command line, for example:
+
+    python raster.py --engine population --ticks 500 --output frames
+    ffmpeg -framerate 30 -i frames/frame%06d.png run.mp4
+'''
+
+import argparse
+import os
+import struct
+import zlib
+import numpy
+import ensemble
+import population
+import sim_core
+
+# fill color of each organism type code, the same colors as the
+# organismColors of the viewer in natural_selection.py
+organismColors = numpy.array([(10, 117, 31), # plant
+							  (0, 0, 255), # herbivore: blue
+							  (255, 165, 0), # omnivore: orange
+							  (255, 0, 0)], # carnivore: red
+							 dtype=numpy.uint8)
+
+_discCache = {}
+
+def discOffsets(radiusX, radiusY):
+	'''
+	Returns two arrays holding the row and column offsets of the
+	pixels covered by an ellipse with the given radii in pixels,
+	centered on a pixel.
+	'''
+	key = (radiusX, radiusY)
+	if key not in _discCache:
+		radiusX = max(radiusX, .5)
+		radiusY = max(radiusY, .5)
+		rows, columns = numpy.mgrid[-int(radiusY):int(radiusY) + 1, -int(radiusX):int(radiusX) + 1]
+		inside = (columns / radiusX) ** 2 + (rows / radiusY) ** 2 <= 1
+		_discCache[key] = (rows[inside], columns[inside])
+	return _discCache[key]
+
+def organismArrays(sim):
+	'''
+	Collects the positions, sizes and type codes of the living
+	organisms of a simulation, a population or anything else with
+	an organismArrays method (such as snapshot.simulationSnapshot).
+
+	Return Value:
+		A tuple (x, y, size, typeCode) of arrays with one entry
+		per living organism.
+	'''
+	if hasattr(sim, 'organismArrays'):
+		return sim.organismArrays()
+	if isinstance(sim, population.population):
+		living = numpy.flatnonzero(sim.alive[:sim.count])
+		return sim.pos[living, 0], sim.pos[living, 1], sim.size[living], sim.typeCode[living]
+
+	organisms = sim.getOrganisms()
+	x = numpy.empty(len(organisms))
+	y = numpy.empty(len(organisms))
+	size = numpy.empty(len(organisms))
+	typeCode = numpy.empty(len(organisms), dtype=numpy.int8)
+	for index, organism in enumerate(organisms):
+		x[index], y[index] = organism.getPos()
+		size[index] = organism.getSize()
+		typeCode[index] = population.typeCodes[organism.getType()]
+	return x, y, size, typeCode
+
+def writePPM(path, pixels):
+	'''
+	Writes an RGB image (a height x width x 3 array of uint8) as a
+	binary PPM file.
+	'''
+	height, width = pixels.shape[:2]
+	with open(path, 'wb') as output:
+		output.write('P6\n{} {}\n255\n'.format(width, height).encode('ascii'))
+		output.write(numpy.ascontiguousarray(pixels).tobytes())
+
+def pngChunk(chunkType, data):
+	'''
+	Returns a PNG chunk holding the given data.
+	'''
+	return struct.pack('>I', len(data)) + chunkType + data + struct.pack('>I', zlib.crc32(chunkType + data))
+
+def writePNG(path, pixels, compression = 6):
+	'''
+	Writes an RGB image (a height x width x 3 array of uint8) as a
+	PNG file.
+	'''
+	height, width = pixels.shape[:2]
+	# every scanline starts with filter type 0 (none)
+	scanlines = numpy.zeros((height, width * 3 + 1), dtype=numpy.uint8)
+	scanlines[:, 1:] = pixels.reshape(height, width * 3)
+	with open(path, 'wb') as output:
+		output.write(b'\x89PNG\r\n\x1a\n')
+		output.write(pngChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+		output.write(pngChunk(b'IDAT', zlib.compress(scanlines.tobytes(), compression)))
+		output.write(pngChunk(b'IEND', b''))
+
+def densityGrid(sim, columns, rows, bounds = None, background = (255, 255, 255)):
+	'''
+	Aggregates the living organisms of a simulation into a grid of
+	cells and colors every cell by the organisms in it: the hue is
+	the mix of the colors of their types and the intensity grows
+	with the logarithm of their number, relative to the fullest
+	cell.
+
+	Parameters:
+		sim: The simulation (or population).
+		columns, rows: The size of the grid in cells.
+		bounds (optional): The world coordinates (xlow, ylow,
+						   xhigh, yhigh) covered by the grid.
+						   Defaults to the habitat.
+		background (optional): The RGB color of empty cells.
+
+	Return Value:
+		A rows x columns x 3 array of uint8 holding the RGB color
+		of every cell, the first row being the top of the grid.
+	'''
+	if bounds == None:
+		bounds = (-sim_core.windowSize, -sim_core.windowSize, sim_core.windowSize, sim_core.windowSize)
+	xlow, ylow, xhigh, yhigh = bounds
+	x, y, size, typeCode = organismArrays(sim)
+	cellColumns = numpy.clip(((x - xlow) / (xhigh - xlow) * columns).astype(numpy.int64), 0, columns - 1)
+	cellRows = numpy.clip(((yhigh - y) / (yhigh - ylow) * rows).astype(numpy.int64), 0, rows - 1)
+	cells = (cellRows * columns + cellColumns) * len(organismColors) + typeCode
+	counts = numpy.bincount(cells, minlength=rows * columns * len(organismColors))
+	counts = counts.reshape(rows, columns, len(organismColors)).astype(numpy.float64)
+
+	totals = counts.sum(axis=2)
+	mix = counts @ organismColors.astype(numpy.float64) / numpy.maximum(totals, 1)[:, :, None]
+	intensity = numpy.log1p(totals) / numpy.log1p(max(totals.max(), 1))
+	colors = numpy.asarray(background, dtype=numpy.float64) * (1 - intensity[:, :, None]) + mix * intensity[:, :, None]
+	return numpy.rint(colors).astype(numpy.uint8)
+
+class frameBuffer:
+	'''
+	This class is an offscreen RGB image that organisms are drawn
+	into. World coordinates are mapped to pixels the same way a
+	GraphWin maps them after setCoords.
+	'''
+
+	def __init__(self, width = 700, height = 700, bounds = None, background = (255, 255, 255)):
+		'''
+		Initializes an image filled with the background color.
+
+		Parameters:
+			width, height (optional): The size of the image in
+									  pixels.
+			bounds (optional): The world coordinates (xlow, ylow,
+							   xhigh, yhigh) shown by the image.
+							   Defaults to the habitat,
+							   -sim_core.windowSize to
+							   sim_core.windowSize on both axes.
+			background (optional): The RGB color of the
+								   background.
+		'''
+		self.width = width
+		self.height = height
+		self.bounds = bounds
+		self.background = numpy.array(background, dtype=numpy.uint8)
+		self.pixels = numpy.empty((height, width, 3), dtype=numpy.uint8)
+		self.clear()
+
+	def clear(self):
+		'''
+		Fills the image with the background color.
+		'''
+		self.pixels[:] = self.background
+
+	def getBounds(self):
+		'''
+		Returns the world coordinates (xlow, ylow, xhigh, yhigh)
+		shown by the image.
+		'''
+		if self.bounds == None:
+			return (-sim_core.windowSize, -sim_core.windowSize, sim_core.windowSize, sim_core.windowSize)
+		return self.bounds
+
+	def drawDiscs(self, x, y, radius, colors, chunkElements = 1 << 22):
+		'''
+		Draws filled discs. Discs whose radii round to the same
+		number of half pixels are stamped together with a single
+		array assignment. Later discs are drawn over earlier ones
+		within a group of the same radius.
+
+		Parameters:
+			x, y, radius: Arrays of the centers and radii of the
+						  discs in world coordinates.
+			colors: An array of the RGB color of every disc.
+			chunkElements (optional): The largest number of
+									  pixels stamped at once.
+
+		Return Value: none
+		'''
+		xlow, ylow, xhigh, yhigh = self.getBounds()
+		xscale = (xhigh - xlow) / self.width
+		yscale = (yhigh - ylow) / self.height
+		columns = numpy.rint((numpy.asarray(x) - xlow) / xscale).astype(numpy.int64)
+		rows = numpy.rint((yhigh - numpy.asarray(y)) / yscale).astype(numpy.int64)
+		radius = numpy.asarray(radius)
+		radiiX = numpy.rint(radius / xscale * 2) / 2
+		radiiY = numpy.rint(radius / yscale * 2) / 2
+		colors = numpy.asarray(colors, dtype=numpy.uint8)
+
+		keys = numpy.stack((radiiX, radiiY), axis=1)
+		uniqueKeys, groups = numpy.unique(keys, axis=0, return_inverse=True)
+		groups = groups.reshape(-1)
+		order = numpy.argsort(groups, kind='stable')
+		starts = numpy.searchsorted(groups[order], numpy.arange(len(uniqueKeys) + 1))
+		for group, (radiusX, radiusY) in enumerate(uniqueKeys):
+			offsetRows, offsetColumns = discOffsets(float(radiusX), float(radiusY))
+			members = order[starts[group]:starts[group + 1]]
+			step = max(chunkElements // len(offsetRows), 1)
+			for start in range(0, len(members), step):
+				chunk = members[start:start + step]
+				pixelRows = rows[chunk, None] + offsetRows
+				pixelColumns = columns[chunk, None] + offsetColumns
+				inside = (pixelRows >= 0) & (pixelRows < self.height) & (pixelColumns >= 0) & (pixelColumns < self.width)
+				pixelColors = numpy.broadcast_to(colors[chunk, None, :], pixelRows.shape + (3,))
+				self.pixels[pixelRows[inside], pixelColumns[inside]] = pixelColors[inside]
+
+	def drawSimulation(self, sim):
+		'''
+		Clears the image and draws every living organism of the
+		simulation, plants first so animals are drawn over them.
+
+		Parameters:
+			sim: The simulation (or population) to draw.
+
+		Return Value: none
+		'''
+		self.clear()
+		x, y, size, typeCode = organismArrays(sim)
+		for layer in (typeCode == population.PLANT, typeCode != population.PLANT):
+			self.drawDiscs(x[layer], y[layer], size[layer], organismColors[typeCode[layer]])
+
+	def write(self, path):
+		'''
+		Writes the image to a file. The format is chosen by the
+		extension of the file name: .ppm or .png.
+		'''
+		extension = os.path.splitext(path)[1].lower()
+		if extension == '.ppm':
+			writePPM(path, self.pixels)
+		elif extension == '.png':
+			writePNG(path, self.pixels)
+		else:
+			raise ValueError('unknown image format: {}'.format(extension))
+
+class rasterViewer:
+	'''
+	This class is a viewer (see simulation.attachViewer) that
+	renders the simulation into a frameBuffer after every tick and
+	writes each frame to a numbered image file.
+	'''
+
+	def __init__(self, directory, width = 700, height = 700, every = 1, imageFormat = 'png', bounds = None):
+		'''
+		Initializes the viewer and creates the output directory.
+
+		Parameters:
+			directory: The directory the frames are written to.
+			width, height (optional): The size of the frames.
+			every (optional): Only write every this many ticks.
+			imageFormat (optional): 'png' or 'ppm'.
+			bounds (optional): The world coordinates shown (see
+							   frameBuffer).
+		'''
+		self.directory = directory
+		self.every = every
+		self.pattern = 'frame{:06d}.' + imageFormat
+		self.frame = frameBuffer(width, height, bounds)
+		self.framesWritten = 0
+		os.makedirs(directory, exist_ok=True)
+
+	def organismsDied(self, organisms):
+		'''
+		Nothing needs to be undrawn since every frame is drawn
+		from scratch.
+		'''
+		pass
+
+	def drawSimulation(self, sim):
+		'''
+		Renders and writes the current tick of the simulation if
+		it is one of the ticks being recorded.
+		'''
+		if sim.tick % self.every == 0:
+			self.frame.drawSimulation(sim)
+			self.frame.write(os.path.join(self.directory, self.pattern.format(sim.tick)))
+			self.framesWritten += 1
+
+def main():
+	'''
+	Runs a headless simulation from the command line and writes
+	its frames.
+	'''
+	parser = argparse.ArgumentParser(description='Render a natural selection simulation to image files.')
+	parser.add_argument('--engine', choices=ensemble.engineNames, default='object')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--ticks', type=int, default=None, help='largest number of ticks (default: sim_core.gameTicks)')
+	parser.add_argument('--every', type=int, default=1, help='write every this many ticks')
+	parser.add_argument('--width', type=int, default=700)
+	parser.add_argument('--height', type=int, default=700)
+	parser.add_argument('--format', choices=('png', 'ppm'), default='png')
+	parser.add_argument('--output', default='frames', help='directory to write the frames to')
+	arguments = parser.parse_args()
+
+	sim = ensemble.newSimulation(arguments.engine, arguments.seed)
+
+	viewer = rasterViewer(arguments.output, arguments.width, arguments.height, arguments.every, arguments.format)
+	sim.attachViewer(viewer)
+	viewer.drawSimulation(sim)
+	sim_core.runSimulation(sim, ensemble.tickLimit(arguments.ticks))
+	print('{} frames written to {}'.format(viewer.framesWritten, arguments.output))
+
+if __name__ == '__main__':
+	main()
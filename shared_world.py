@@ -0,0 +1,293 @@
+'''
+shared_world.py
+
+Lets a simulation running in one process be watched from another.
+A worldPublisher attached to the simulation as its viewer writes
+the living organisms (ids, positions, sizes and types) into a
+multiprocessing.shared_memory segment after every tick; any number
+of viewers can attach to the segment by name with a worldReader,
+read consistent snapshots of it and detach again, without the
+simulating process knowing or waiting for them.
+
+Writers and readers agree through a sequence lock: the writer makes
+the sequence number odd before it changes the segment and even
+again afterwards, and a reader retries until it has copied the
+segment between two reads of the same even sequence number.
+
+Run from the command line, for example:
+
+    python shared_world.py run --name world --engine population
+    python shared_world.py watch --name world
+'''
+
+import argparse
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy
+import ensemble
+import population
+import raster
+import sim_core
+import snapshot
+
+magic = b'NSW1'
+
+# magic, sequence, tick, count, capacity, livingOrganisms, flags and windowSize
+headerFormat = '<4s4xQqqqqqd'
+headerSize = 64
+sequenceOffset = 8
+
+# header flags
+FINISHED = 1 # the simulation is over
+TRUNCATED = 2 # there were more organisms than the segment holds
+
+# the arrays following the header, each holding capacity values
+arrayTypes = (('ids', numpy.int64), ('x', numpy.float64), ('y', numpy.float64),
+			  ('size', numpy.float64), ('typeCode', numpy.int8))
+
+def segmentSize(capacity):
+	'''
+	Returns the number of bytes of a segment holding capacity
+	organisms.
+	'''
+	return headerSize + sum(numpy.dtype(dtype).itemsize for name, dtype in arrayTypes) * capacity
+
+def mapArrays(buffer, capacity):
+	'''
+	Returns a dictionary of the NumPy arrays of a segment, viewing
+	its memory without copying it.
+	'''
+	arrays = {}
+	offset = headerSize
+	for name, dtype in arrayTypes:
+		arrays[name] = numpy.ndarray((capacity,), dtype=dtype, buffer=buffer, offset=offset)
+		offset += numpy.dtype(dtype).itemsize * capacity
+	return arrays
+
+class worldPublisher:
+	'''
+	This class is a viewer (see simulation.attachViewer) that
+	publishes the living organisms of the simulation into a new
+	shared memory segment instead of drawing them.
+	'''
+
+	def __init__(self, name = None, capacity = 100000, interval = None):
+		'''
+		Creates the shared memory segment.
+
+		Parameters:
+			name (optional): The name of the segment. Otherwise a
+							 unique name is chosen (see the name
+							 attribute).
+			capacity (optional): The largest number of organisms
+								 the segment holds. Any others are
+								 left out of it.
+			interval (optional): Publish at most once every this
+								 many seconds. Otherwise every tick
+								 is published.
+		'''
+		self.capacity = capacity
+		self.interval = interval
+		self.nextPublish = None
+		self.memory = shared_memory.SharedMemory(name=name, create=True, size=segmentSize(capacity))
+		self.name = self.memory.name
+		self.arrays = mapArrays(self.memory.buf, capacity)
+		self.sequence = 0
+		self.flags = 0
+		self.writeHeader(0, 0, 0)
+
+	def writeHeader(self, tick, count, livingOrganisms):
+		struct.pack_into(headerFormat, self.memory.buf, 0, magic, self.sequence, tick, count, self.capacity,
+						 livingOrganisms, self.flags, sim_core.windowSize)
+
+	def setSequence(self, sequence):
+		self.sequence = sequence
+		struct.pack_into('<Q', self.memory.buf, sequenceOffset, sequence)
+
+	def organismsDied(self, organisms):
+		'''
+		Nothing to do, since readers can tell which organisms died
+		by comparing what they read.
+		'''
+		pass
+
+	def drawSimulation(self, sim):
+		'''
+		Publishes the simulation, unless it was published less
+		than interval seconds ago.
+		'''
+		if self.interval != None:
+			now = time.perf_counter()
+			if self.nextPublish != None and now < self.nextPublish:
+				return
+			self.nextPublish = now + self.interval
+		self.publish(sim)
+
+	def publish(self, sim):
+		'''
+		Writes the living organisms of a simulation (or population)
+		into the segment.
+		'''
+		if isinstance(sim, population.population):
+			ids = sim.ids[:sim.count][sim.alive[:sim.count]]
+		else:
+			ids = [organism.getId() for organism in sim.getOrganisms()]
+		values = (ids,) + tuple(raster.organismArrays(sim))
+		count = min(len(ids), self.capacity)
+		if count < len(ids):
+			self.flags |= TRUNCATED
+		else:
+			self.flags &= ~TRUNCATED
+
+		self.setSequence(self.sequence + 1)
+		for (name, dtype), array in zip(arrayTypes, values):
+			self.arrays[name][:count] = array[:count]
+		self.writeHeader(sim.tick, count, sim.livingOrganisms)
+		self.setSequence(self.sequence + 1)
+
+	def finish(self):
+		'''
+		Marks the simulation as over, so readers know nothing more
+		will be published.
+		'''
+		self.setSequence(self.sequence + 1)
+		self.flags |= FINISHED
+		tick, count, capacity, livingOrganisms = struct.unpack_from('<qqqq', self.memory.buf, 16)
+		self.writeHeader(tick, count, livingOrganisms)
+		self.setSequence(self.sequence + 1)
+
+	def close(self):
+		'''
+		Removes the segment. Readers that are still attached keep
+		their mapping until they close it.
+		'''
+		self.arrays = None
+		self.memory.close()
+		self.memory.unlink()
+
+class worldReader:
+	'''
+	This class attaches to a segment written by a worldPublisher
+	in another process and reads snapshots from it.
+	'''
+
+	def __init__(self, name):
+		'''
+		Attaches to a segment.
+
+		Parameters:
+			name: The name of the segment.
+		'''
+		try:
+			self.memory = shared_memory.SharedMemory(name=name, track=False)
+		except TypeError:
+			# before Python 3.13 the resource tracker would remove
+			# the segment when this process exits
+			self.memory = shared_memory.SharedMemory(name=name)
+			resource_tracker.unregister(self.memory._name, 'shared_memory')
+		header = struct.unpack_from(headerFormat, self.memory.buf, 0)
+		if header[0] != magic:
+			self.memory.close()
+			raise ValueError('{} is not a shared world segment'.format(name))
+		self.capacity = header[4]
+		# the windowSize of the publishing process
+		self.windowSize = header[7]
+		self.arrays = mapArrays(self.memory.buf, self.capacity)
+
+	def getSequence(self):
+		'''
+		Returns the current sequence number of the segment, which
+		changes whenever something is published.
+		'''
+		return struct.unpack_from('<Q', self.memory.buf, sequenceOffset)[0]
+
+	def read(self):
+		'''
+		Copies a consistent snapshot out of the segment, retrying
+		while the publisher is writing.
+
+		Return Value:
+			A tuple (sequence, flags, windowSize, snapshot) where
+			the snapshot is a snapshot.simulationSnapshot keyed by
+			organism id.
+		'''
+		while True:
+			sequence = self.getSequence()
+			if sequence % 2 == 0:
+				header = struct.unpack_from(headerFormat, self.memory.buf, 0)
+				count = header[3]
+				copies = {name: array[:count].copy() for name, array in self.arrays.items()}
+				if self.getSequence() == sequence:
+					break
+			time.sleep(0)
+
+		tick, livingOrganisms, flags, windowSize = header[2], header[5], header[6], header[7]
+		arrays = (copies['x'], copies['y'], copies['size'], copies['typeCode'])
+		return sequence, flags, windowSize, snapshot.simulationSnapshot(tick, livingOrganisms, copies['ids'].tolist(), arrays)
+
+	def close(self):
+		'''
+		Detaches from the segment without removing it.
+		'''
+		self.arrays = None
+		self.memory.close()
+
+def runPublished(sim, name = None, capacity = 100000, interval = None, ticks = None, timeBudget = None):
+	'''
+	Runs a simulation headless, publishing it into a shared memory
+	segment until it is over. The segment is removed afterwards.
+
+	Parameters:
+		sim: The simulation (or population) to run.
+		name, capacity, interval (optional): Passed on to
+											 worldPublisher.
+		ticks, timeBudget (optional): Passed on to
+									  sim_core.runSimulation.
+
+	Return Value: The number of ticks that were run.
+	'''
+	publisher = worldPublisher(name, capacity, interval)
+	sim.attachViewer(publisher)
+	try:
+		publisher.publish(sim)
+		ticksRun = sim_core.runSimulation(sim, ticks, timeBudget)
+		publisher.finish()
+	finally:
+		sim.detachViewer()
+		publisher.close()
+	return ticksRun
+
+def main():
+	'''
+	Runs a published simulation or watches one from the command
+	line.
+	'''
+	parser = argparse.ArgumentParser(description='Share a natural selection simulation between processes.')
+	parser.add_argument('command', choices=('run', 'watch'))
+	parser.add_argument('--name', default='natural_selection_world', help='name of the shared memory segment')
+	parser.add_argument('--engine', choices=ensemble.engineNames, default='object')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--ticks', type=int, default=None)
+	parser.add_argument('--time-budget', type=float, default=None)
+	parser.add_argument('--capacity', type=int, default=100000)
+	parser.add_argument('--interval', type=float, default=None, help='seconds between publishes')
+	parser.add_argument('--frame-rate', type=float, default=30, help='frames per second of the viewer')
+	arguments = parser.parse_args()
+
+	if arguments.command == 'run':
+		sim = ensemble.newSimulation(arguments.engine, arguments.seed)
+		runPublished(sim, arguments.name, arguments.capacity, arguments.interval, ensemble.tickLimit(arguments.ticks),
+					 arguments.time_budget)
+	else:
+		import natural_selection
+		reader = worldReader(arguments.name)
+		viewer = natural_selection.naturalSelectionSim()
+		try:
+			viewer.watchSharedWorld(reader, arguments.frame_rate)
+		finally:
+			reader.close()
+			viewer.close()
+
+if __name__ == '__main__':
+	main()
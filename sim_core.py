@@ -0,0 +1,1061 @@
+'''
+sim_core.py
+
+The headless core of the natural selection simulation. It keeps
+track of the population of organisms and advances it one game tick
+at a time (movement, collisions, starvation and plant spawning)
+without importing any graphics, so simulations can be run on
+machines that have no display. A viewer (see natural_selection.py)
+can be attached to a simulation to draw it after every tick.
+runSimulation runs a simulation as fast as possible, pacing it in
+real time only when a viewer is watching; runSimulationAsync does
+the same as an asyncio coroutine.
+'''
+
+import itertools
+import math
+import random
+import time
+
+# Simulation configuration
+windowSize = 100
+gameTicks = 200
+eventLog = False # give new simulations an events.eventLog
+speedFactor = 1
+
+# Ecosystem configuration
+omnivoreCount = 7 # organisms of each type spawned at the start
+herbivoreCount = 5
+carnivoreCount = 0 # BUG: Carnivores are not fully implemented yet.
+plantCount = 15
+minSize = 1 # range of sizes and speeds of new organisms
+maxSize = 7
+minSpeed = 5
+maxSpeed = 10
+plantSpawnChance = .7 # chance of a new plant growing each tick
+
+# the phases of a game tick, in order, and the simulation method
+# that runs each one (see tickProfiler in profiler.py)
+tickPhases = (('nearestTarget', 'findTargets'),
+			  ('movement', 'moveOrganisms'),
+			  ('checkCollisions', 'resolveCollisions'),
+			  ('starvation', 'starveOrganisms'),
+			  ('plantSpawns', 'spawnPlants'),
+			  ('deaths', 'endTick'),
+			  ('draw', 'render'))
+
+# the settings that configure accepts
+settingNames = ('windowSize', 'gameTicks', 'eventLog', 'speedFactor',
+				'omnivoreCount', 'herbivoreCount', 'carnivoreCount', 'plantCount',
+				'minSize', 'maxSize', 'minSpeed', 'maxSpeed', 'plantSpawnChance')
+
+# gives every organism a unique id
+organismIds = itertools.count()
+
+def defaultEventLog():
+	'''
+	Returns a new in-memory events.eventLog if eventLog is set;
+	else None.
+	'''
+	if not eventLog:
+		return None
+	import events
+	return events.eventLog()
+
+def configure(**settings):
+	'''
+	Changes the configuration of the simulation.
+
+	Parameters:
+		settings: New values for any of the globals listed in
+				  settingNames, for example windowSize = 200.
+
+	Return Value:
+		A dictionary of the previous values of the changed
+		settings, which can be passed back to configure to
+		undo the change.
+	'''
+	for name in settings:
+		if name not in settingNames:
+			raise ValueError('unknown setting: {}'.format(name))
+	moduleGlobals = globals()
+	previous = {name: moduleGlobals[name] for name in settings}
+	moduleGlobals.update(settings)
+	return previous
+
+class organism:
+	'''
+	This class represents organism objects that all 
+	have different traits and allows them to move about
+	and consume each other every game tick.
+	'''
+	
+	def __init__(self, x, y, size, speed, organismType):
+		'''
+		Initializes the organism by assigning it's traits.
+
+		Parameters:
+			x, y: The x and y starting coordinates of the organism.
+			size: The size of the organism. This effects the graphical
+			      size of the organism as well as the strength of the
+			      organism in combat.
+			speed: The maximum speed at which an organism can move each
+			       game tick.
+			organismType: The type of an organism (Plant, omnivore, 
+						  herbivore, or carnivore)
+
+		Return Value: none
+		'''
+		self.pos = [x, y]
+		self.size = size
+		self.speed = speed
+		self.type = organismType
+		self.prey = self.preyList()
+		self.hunger = 50
+		self.alive = True
+		self.id = next(organismIds)
+
+	def update(self, organismsList, grid = None):
+		'''
+		Updates the organism's position and hunger every
+		simulation tick.
+
+		Parameters:
+			organismsList: the list of organisms (including
+						   the organism itself)
+			grid (optional): A spatialGrid holding the organisms.
+							 When given, the organism chases the
+							 nearest prey found in the grid and
+							 only checks nearby organisms for
+							 collisions.
+
+		Return Value: none
+		'''
+		self.chooseTarget(organismsList, grid)
+		self.move(grid)
+
+		# checks for collisions and responds accordingly
+		self.checkCollisions(organismsList, grid)
+
+		if not self.alive:
+			return # the organism was killed in a collision
+
+		self.starve(grid)
+
+	def chooseTarget(self, organismsList, grid = None):
+		'''
+		Picks the organism that the organism will move towards
+		this tick.
+
+		Parameters:
+			organismsList: the list of organisms (including
+						   the organism itself)
+			grid (optional): A spatialGrid holding the organisms.
+							 When given, the organism chases the
+							 nearest prey found in the grid.
+
+		Return Value: The chosen target (or None).
+		'''
+		if grid != None:
+			self.closestTarget = self.nearestPrey(grid)
+		else:
+			self.closestTarget = self.nearestTarget(organismsList)
+		return self.closestTarget
+
+	def move(self, grid = None):
+		'''
+		Moves the organism towards the target picked by
+		chooseTarget if it is prey (or randomly otherwise) and
+		keeps it on the screen.
+
+		Parameters:
+			grid (optional): A spatialGrid holding the organisms,
+							 which is told about the move.
+
+		Return Value: none
+		'''
+		# move the organism
+		if self.closestTarget != None and self.isPrey(self.closestTarget):
+			self.moveToTarget(self.closestTarget)
+		else:
+			self.moveRandom()
+
+		# keep the organisms from leaving the screen
+		self.stayInScreen()
+
+		if grid != None:
+			grid.move(self)
+
+	def starve(self, grid = None):
+		'''
+		Makes the organism hungrier and kills it if it has
+		starved.
+
+		Parameters:
+			grid (optional): A spatialGrid holding the organisms.
+
+		Return Value: none
+		'''
+		self.hunger += -0.5
+		if self.hunger <= 0:
+			self.die(grid)
+
+	def isPrey(self, target):
+		'''
+		Given a target organism, checks if the target is prey
+		for the checking organism.
+
+		Parameters:
+			target: The target organism that is being checked.
+
+		Return Value:
+			True if the target organism is prey for the self;
+			else False.
+		'''
+		if target.getType() == 'plant' and 'plant' in self.prey:
+			return True
+		elif target.getType() in self.prey and target.getSize() < self.size:
+			return True
+		return False
+
+	def preyList(self):
+		'''
+		Taking in the self organism's type, returns a list of
+		prey types. For example an herbivore will only return
+		'plant'.
+
+		Return Value:
+			A tuple containing all of the acceptable prey types.
+		'''
+		if self.type == 'omnivore':
+			return ('plant', 'omnivore', 'herbivore', 'carnivore')
+		elif self.type == 'herbivore':
+			return ('plant')
+		elif self.type == 'carnivore':
+			return ('omnivore', 'herbivore', 'carnivore')
+		return ()
+
+	def getId(self):
+		'''
+		Returns the unique id of the organism.
+		'''
+		return self.id
+
+	def getPos(self):
+		'''
+		Returns the position of the given organism as a list
+		containing two points [x, y].
+		'''
+		return self.pos
+
+	def getSize(self):
+		'''
+		Returns the size of the given organism as a float value.
+		'''
+		return self.size
+
+	def getType(self):
+		'''
+		Returns the type of the given organism as a string value.
+		'''
+		return self.type
+
+	def getSpeed(self):
+		'''
+		Returns the speed of the given organism as a float value.
+		'''
+		return self.speed
+
+	def isAlive(self):
+		'''
+		Returns True if the organism has not died yet.
+		'''
+		return self.alive
+
+	def die(self, grid = None):
+		'''
+		"Kills" the given organism by marking it as dead. Dead
+		organisms are left in the list of organisms as tombstones
+		until the list is compacted (see compact) so that lists
+		are never changed while they are being iterated over.
+
+		Parameters:
+			grid (optional): A spatialGrid to remove the
+							 organism from.
+
+		Return Value: none
+		'''
+		self.alive = False
+		if grid != None:
+			grid.remove(self)
+
+	def distanceFromTarget(self, target):
+		'''
+		Calculates and returns the distance between the given
+		organism and the target organism.
+
+		Parameters:
+			target: A target organism.
+
+		Return Value: The distance between the given organism
+					  and the target organism.
+		'''
+		return (abs(target.getPos()[0] - self.pos[0]) + abs(target.getPos()[1] - self.pos[1]))
+
+	def nearestTarget(self, organismsList):
+		'''
+		Searches through the list of other organisms and
+		returns the organism object of the nearest organism.
+
+		Parameters:
+			organismsList: The list of living organisms.
+
+		Return Value: The organism object of the nearest
+					  organism.
+		'''
+		self.otherOrganisms = [organism for organism in organismsList if organism.alive and organism != self]
+		self.closestTarget = self.otherOrganisms[0]
+		for organism in self.otherOrganisms[1:]:
+			if self.distanceFromTarget(organism) < self.distanceFromTarget(self.closestTarget):
+				self.closestTarget = organism
+		return self.closestTarget
+
+	def nearestPrey(self, grid):
+		'''
+		Searches the cells of the grid around the organism,
+		widening the search one ring of cells at a time, and
+		returns the nearest organism that is prey.
+
+		Parameters:
+			grid: A spatialGrid holding the living organisms.
+
+		Return Value: The nearest prey organism, or None if
+					  there is no prey left.
+		'''
+		return grid.nearest(self.pos[0], self.pos[1], self.isPrey)
+
+	def moveToTarget(self, target):
+		'''
+		Moves the given organism towards the target organism.
+
+		Parameters:
+			target: A target organism.
+
+		Return Value: none
+		'''
+		self.targetPosX, self.targetPosY = target.getPos()
+		self.distanceX, self.distanceY = (self.targetPosX - self.pos[0], self.targetPosY - self.pos[1])
+
+		if self.distanceX >= 0:
+			self.velocityX = self.speed * speedFactor
+			if abs(self.distanceX) < abs(self.velocityX):
+				self.velocityX = self.distanceX
+		else:
+			self.velocityX = -self.speed * speedFactor
+			if abs(self.distanceX) < abs(self.velocityX):
+				self.velocityX = self.distanceX
+		self.pos[0] += self.velocityX
+
+		if self.distanceY >= 0:
+			self.velocityY = self.speed * speedFactor
+			if abs(self.distanceY) < abs(self.velocityY):
+				self.velocityX = self.distanceX
+		else:
+			self.velocityY = -self.speed * speedFactor
+			if abs(self.distanceY) < abs(self.velocityY):
+				self.velocityY = self.distanceY
+		self.pos[1] += self.velocityY
+
+	def moveRandom(self):
+		'''
+		Moves the given organism randomly in 2D space.
+		'''
+		self.velocity = (random.uniform(-self.speed, self.speed) * speedFactor, random.uniform(-self.speed, self.speed) * speedFactor)
+		self.pos = [self.pos[0] + self.velocity[0], self.pos[1] + self.velocity[1]]
+
+	def stayInScreen(self):
+		'''
+		Prevents the organisms from leaving the screen.
+		'''
+		if self.pos[0] + self.size >= windowSize:
+			self.pos[0] = windowSize - self.size
+		elif self.pos[0] - self.size <= -windowSize:
+			self.pos[0] = -windowSize + self.size
+		elif self.pos[1] + self.size >= windowSize:
+			self.pos[1] = windowSize - self.size
+		elif self.pos[1] - self.size <= -windowSize:
+			self.pos[1] = -windowSize + self.size
+
+	def checkCollision(self, collidingOrganism):
+		'''
+		Checks if the given organism is colliding with the
+		"collidingOrganism".
+
+		Parameters:
+			collidingOrganism: The organism to be tested against.
+
+		Return Value:
+			True if the given organism is colliding with the
+			"collidingOrganism"; else returns False.
+		'''
+		self.collidingOrganismPos = collidingOrganism.getPos()
+		self.collidingOrganismsize = collidingOrganism.getSize()
+
+		if (self.pos[0] - self.size) <= self.collidingOrganismPos[0] <= (self.pos[0] + self.size):
+			if (self.pos[1] - self.size) <= self.collidingOrganismPos[1] <= (self.pos[1] + self.size):
+				return True
+		elif (self.collidingOrganismPos[0] - self.collidingOrganismsize) <= self.pos[0] <= (self.collidingOrganismPos[0] + self.collidingOrganismsize):
+			if (self.collidingOrganismPos[1] - self.collidingOrganismsize) <= self.pos[1] <= (self.collidingOrganismPos[1] + self.collidingOrganismsize):
+				return True
+		return False
+
+	def isCollidingWith(self, collidingOrganism):
+		'''
+		Checks if either organism's center lies inside the
+		bounding box of the other.
+
+		Parameters:
+			collidingOrganism: The organism to be tested against.
+
+		Return Value:
+			True if the two organisms are colliding; else False.
+		'''
+		x, y = self.pos
+		size = self.size
+		otherX, otherY = collidingOrganism.pos
+		otherSize = collidingOrganism.size
+		return (((x - size) <= otherX <= (x + size) and (y - size) <= otherY <= (y + size)) or
+				((otherX - otherSize) <= x <= (otherX + otherSize) and (otherY - otherSize) <= y <= (otherY + otherSize)))
+
+	def eat(self, prey, grid = None):
+		'''
+		Kills the prey organism and feeds the given organism.
+
+		Parameters:
+			prey: The organism being eaten.
+			grid (optional): A spatialGrid holding the organisms.
+
+		Return Value: none
+		'''
+		self.hunger += 8
+		prey.die(grid)
+
+	def checkCollisions(self, organismsList, grid = None):
+		'''
+		Checks if the organism is colliding with any organisms
+		and reacts appropriately by killing one of the
+		organisms if it is prey of the other.
+
+		Parameters:
+			organismsList: The list of organisms.
+			grid (optional): A spatialGrid holding the organisms.
+							 When given, only the organisms in
+							 nearby cells are checked.
+
+		Return Value: none
+		'''
+		if grid == None:
+			candidates = organismsList
+		else:
+			# two organisms can only collide if they are closer than
+			# the size of the larger one on both axes
+			candidates = grid.neighbors(self.pos[0], self.pos[1], max(self.size, grid.maxSize))
+
+		for organism in candidates:
+			if organism != self: # prevents organism from checking if it's colliding with itself
+				if not organism.alive:
+					continue
+				if self.checkCollision(organism):
+					if self.isPrey(organism):
+						self.eat(organism, grid)
+					elif organism.isPrey(self):
+						organism.eat(self, grid)
+						return
+
+def compact(organismsList):
+	'''
+	Removes every dead organism from the list in a single pass.
+
+	Parameters:
+		organismsList: The list of organisms to compact.
+
+	Return Value: A list of the organisms that were removed.
+	'''
+	dead = [organism for organism in organismsList if not organism.alive]
+	if dead:
+		organismsList[:] = [organism for organism in organismsList if organism.alive]
+	return dead
+
+class spatialGrid:
+	'''
+	A uniform grid laid over the world that buckets organisms
+	by the cell they are in. Organisms only have to look at the
+	cells around them to find prey or check for collisions, so
+	the cost of a tick grows roughly linearly with the number of
+	organisms instead of quadratically.
+	'''
+
+	def __init__(self, cellSize = None):
+		'''
+		Initializes an empty grid.
+
+		Parameters:
+			cellSize (optional): The width of a cell. Otherwise the
+								 cell size is picked from the density
+								 of the organisms every rebuild.
+		'''
+		self.fixedCellSize = cellSize
+		self.cellSize = cellSize or windowSize / 5
+		self.cells = {}
+		self.organismCells = {}
+		self.maxSize = 0
+		self.bounds = None
+
+	def __contains__(self, organism):
+		return organism in self.organismCells
+
+	def __len__(self):
+		return len(self.organismCells)
+
+	def cellOf(self, x, y):
+		'''
+		Returns the (column, row) of the cell containing the
+		point (x, y).
+		'''
+		return (math.floor(x / self.cellSize), math.floor(y / self.cellSize))
+
+	def rebuild(self, organismsList):
+		'''
+		Empties the grid and adds every organism in the list.
+		'''
+		self.cells = {}
+		self.organismCells = {}
+		self.maxSize = 0
+		self.bounds = None
+		if self.fixedCellSize == None and organismsList:
+			# aim for a couple of organisms per cell
+			area = (2 * windowSize) ** 2
+			self.cellSize = max(math.sqrt(2 * area / len(organismsList)), 1)
+		for organism in organismsList:
+			self.add(organism)
+
+	def add(self, organism):
+		'''
+		Adds an organism to the cell it is in.
+		'''
+		x, y = organism.getPos()
+		cell = self.cellOf(x, y)
+		self.cells.setdefault(cell, {})[organism] = None
+		self.organismCells[organism] = cell
+		self.maxSize = max(self.maxSize, organism.getSize())
+
+		if self.bounds == None:
+			self.bounds = [cell[0], cell[1], cell[0], cell[1]]
+		else:
+			bounds = self.bounds
+			bounds[0] = min(bounds[0], cell[0])
+			bounds[1] = min(bounds[1], cell[1])
+			bounds[2] = max(bounds[2], cell[0])
+			bounds[3] = max(bounds[3], cell[1])
+
+	def remove(self, organism):
+		'''
+		Removes an organism from the grid. Does nothing if the
+		organism is not in the grid.
+		'''
+		cell = self.organismCells.pop(organism, None)
+		if cell != None:
+			del self.cells[cell][organism]
+
+	def move(self, organism):
+		'''
+		Moves an organism into a new cell if its position has
+		changed cells since it was added.
+		'''
+		cell = self.organismCells.get(organism)
+		x, y = organism.getPos()
+		if cell != self.cellOf(x, y):
+			self.remove(organism)
+			self.add(organism)
+
+	def ringCells(self, column, row, radius):
+		'''
+		Yields the cells that are exactly radius cells away from
+		the cell (column, row).
+		'''
+		if radius == 0:
+			yield (column, row)
+			return
+		for x in range(column - radius, column + radius + 1):
+			yield (x, row - radius)
+			yield (x, row + radius)
+		for y in range(row - radius + 1, row + radius):
+			yield (column - radius, y)
+			yield (column + radius, y)
+
+	def nearest(self, x, y, accept):
+		'''
+		Finds the nearest organism to (x, y) that is accepted by
+		the given function, using the same distance as
+		organism.distanceFromTarget. The search widens one ring
+		of cells at a time and stops as soon as no organism in
+		an unsearched ring could be closer than the best one.
+
+		Parameters:
+			x, y: The point to search from.
+			accept: A function taking an organism and returning
+					True if it is a valid result.
+
+		Return Value: The nearest accepted organism, or None.
+		'''
+		if self.bounds == None:
+			return None
+		column, row = self.cellOf(x, y)
+		left, bottom, right, top = self.bounds
+		maxRadius = max(column - left, right - column, row - bottom, top - row)
+
+		closest = None
+		closestDistance = float('inf')
+		for radius in range(maxRadius + 1):
+			for cell in self.ringCells(column, row, radius):
+				for organism in self.cells.get(cell, ()):
+					if accept(organism):
+						otherX, otherY = organism.getPos()
+						distance = abs(otherX - x) + abs(otherY - y)
+						if distance < closestDistance:
+							closest = organism
+							closestDistance = distance
+			if closestDistance <= radius * self.cellSize:
+				break
+		return closest
+
+	def candidatePairs(self, reach):
+		'''
+		Broad phase collision detection. Enumerates every pair of
+		organisms in the grid that are in the same or neighboring
+		cells of a grid of cells reach wide, so that any two
+		organisms within reach of each other on both axes are
+		paired. Each pair is listed once. Pairs of plants are left
+		out since plants never eat.
+
+		The organisms are binned before the first pair is
+		generated, so they can be removed from the grid while the
+		pairs are being iterated over.
+
+		Parameters:
+			reach: The largest distance (on either axis) at which
+				   two organisms can collide.
+
+		Return Value: A generator of (organism, organism) tuples.
+		'''
+		# the members and the non-plant members of every cell
+		cells = {}
+		cellSize = max(reach, 1e-9)
+		for organism in self.organismCells:
+			x, y = organism.pos
+			cell = (math.floor(x / cellSize), math.floor(y / cellSize))
+			members = cells.get(cell)
+			if members == None:
+				members = cells[cell] = ([], [])
+			members[0].append(organism)
+			if organism.type != 'plant':
+				members[1].append(organism)
+
+		for (column, row), (members, movers) in cells.items():
+			if movers:
+				for first in range(len(members)):
+					organism = members[first]
+					if organism.type != 'plant':
+						for second in range(first + 1, len(members)):
+							yield organism, members[second]
+					else:
+						for otherOrganism in members[first + 1:]:
+							if otherOrganism.type != 'plant':
+								yield organism, otherOrganism
+			# only look "forward" so every pair of cells is visited once
+			for cell in ((column + 1, row), (column - 1, row + 1), (column, row + 1), (column + 1, row + 1)):
+				other = cells.get(cell)
+				if other == None:
+					continue
+				others, otherMovers = other
+				if not movers:
+					# only the movers of the other cell can collide
+					# with the plants of this one
+					for organism in members:
+						for otherOrganism in otherMovers:
+							yield organism, otherOrganism
+					continue
+				for organism in members:
+					for otherOrganism in (others if organism.type != 'plant' else otherMovers):
+						yield organism, otherOrganism
+
+	def neighbors(self, x, y, reach):
+		'''
+		Returns a list of the organisms in every cell that
+		overlaps the square of half-width reach around (x, y).
+		'''
+		left, bottom = self.cellOf(x - reach, y - reach)
+		right, top = self.cellOf(x + reach, y + reach)
+		found = []
+		for column in range(left, right + 1):
+			for row in range(bottom, top + 1):
+				cell = self.cells.get((column, row))
+				if cell:
+					found.extend(cell)
+		return found
+
+class simulation:
+	'''
+	This class holds the state of a single simulation run and
+	advances it one game tick at a time. It has no knowledge of
+	graphics; a viewer can be attached to draw the organisms
+	after every tick.
+	'''
+
+	def __init__(self):
+		'''
+		Initializes an empty simulation with no viewer attached.
+		'''
+		self.organisms = []
+		self.movers = []
+		self.grid = spatialGrid()
+		self.viewer = None
+		self.profiler = None
+		self.events = defaultEventLog()
+		self.tick = 0
+		self.livingOrganisms = 0
+		self.resetCounters()
+
+	def __len__(self):
+		return len(self.organisms)
+
+	def attachViewer(self, viewer):
+		'''
+		Attaches a viewer to the simulation. At the end of every
+		tick the viewer's organismsDied method is called with the
+		list of organisms that died during the tick (if any) and
+		then its drawSimulation method is called with the
+		simulation.
+
+		Parameters:
+			viewer: An object with organismsDied(organisms) and
+					drawSimulation(simulation) methods.
+
+		Return Value: none
+		'''
+		self.viewer = viewer
+
+	def detachViewer(self):
+		'''
+		Detaches the current viewer (if any) from the simulation.
+		'''
+		self.viewer = None
+
+	def attachProfiler(self, profiler):
+		'''
+		Attaches a tickProfiler (see profiler.py) that runs and
+		times every phase of the following ticks.
+		'''
+		self.profiler = profiler
+
+	def detachProfiler(self):
+		'''
+		Detaches the current profiler (if any).
+		'''
+		self.profiler = None
+
+	def attachEventLog(self, log):
+		'''
+		Attaches an events.eventLog that records every kill and
+		starvation of the following ticks, numbered like the tick
+		attribute once the tick is over.
+		'''
+		self.events = log
+
+	def detachEventLog(self):
+		'''
+		Detaches the current event log (if any).
+		'''
+		self.events = None
+
+	def resetCounters(self):
+		'''
+		Resets the counts of what happened during the tick.
+		'''
+		self.kills = 0
+		self.starvations = 0
+		self.plantsSpawned = 0
+		self.deaths = 0
+		self.dead = []
+
+	def getOrganisms(self):
+		'''
+		Returns the list of organisms currently in the simulation.
+		'''
+		return self.organisms
+
+	def randomOrganism(self, organismType, position = None):
+		'''
+		Generates a random organism.
+
+		Parameters:
+			organismType: The type of the new organism (Plant,
+						  herbivore, omnivore, carnivore)
+			position (optional): The starting position of the
+								 organism. Otherwise the start
+								 position is randomly generated.
+
+		Return Value: A randomly generated organism object.
+		'''
+		if position == None:
+			x = random.uniform(-(windowSize * .9), windowSize * .9)
+			y = random.uniform(-(windowSize * .9), windowSize * .9)
+		else:
+			x, y = position
+		size = random.uniform(minSize, maxSize)
+		speed = random.uniform(minSpeed, maxSpeed)
+		return organism(x, y, size, speed, organismType)
+
+	def addOrganism(self, organismType, position = None):
+		'''
+		Adds a randomly generated organism of the given type to
+		the simulation.
+
+		Parameters:
+			organismType: The type of the new organism.
+			position (optional): The starting position of the
+								 organism.
+
+		Return Value: The new organism object.
+		'''
+		newOrganism = self.randomOrganism(organismType, position)
+		self.organisms.append(newOrganism)
+		return newOrganism
+
+	def spawnOrganisms(self):
+		'''
+		Spawns in randomly generated organisms by adding them
+		to the list of organisms.
+		'''
+		self.organisms = []
+		for i in range(omnivoreCount):
+			self.addOrganism('omnivore')
+		for i in range(herbivoreCount):
+			self.addOrganism('herbivore')
+		for i in range(carnivoreCount):
+			self.addOrganism('carnivore')
+		for i in range(plantCount):
+			self.addOrganism('plant')
+
+	def resolveCollisions(self):
+		'''
+		Finds every colliding pair of organisms in a single pass
+		over the grid and lets the predator of each pair eat the
+		prey.
+		'''
+		for organism, otherOrganism in self.grid.candidatePairs(self.grid.maxSize):
+			if organism.type == 'plant':
+				organism, otherOrganism = otherOrganism, organism
+
+			# either organism may have been eaten earlier in the pass
+			if not organism.alive or not otherOrganism.alive:
+				continue
+			if organism.isCollidingWith(otherOrganism):
+				if organism.isPrey(otherOrganism):
+					self.eat(organism, otherOrganism)
+				elif otherOrganism.isPrey(organism):
+					self.eat(otherOrganism, organism)
+
+	def eat(self, predator, prey):
+		'''
+		Lets the predator eat the prey, counting the kill and
+		recording it in the event log (if any).
+		'''
+		predator.eat(prey, self.grid)
+		self.kills += 1
+		if self.events != None:
+			self.events.recordKill(self.tick + 1, predator.id, prey.id, predator.size, prey.size, prey.pos[0], prey.pos[1])
+
+	def findTargets(self):
+		'''
+		The first phase of a tick. Rebuilds the grid and picks a
+		target for every living non-plant organism.
+		'''
+		self.resetCounters()
+		self.grid.rebuild(self.organisms)
+
+		self.movers = [organism for organism in self.organisms if organism.getType() != 'plant']
+		self.livingOrganisms = len(self.movers)
+
+		for organism in self.movers:
+			organism.chooseTarget(self.organisms, self.grid)
+
+	def moveOrganisms(self):
+		'''
+		Moves every organism that picked a target this tick.
+		'''
+		for organism in self.movers:
+			organism.move(self.grid)
+
+	def starveOrganisms(self):
+		'''
+		Makes every organism that moved this tick hungrier.
+		'''
+		for organism in self.movers:
+			if organism.alive:
+				organism.starve(self.grid)
+				if not organism.alive:
+					self.starvations += 1
+					if self.events != None:
+						self.events.recordStarvation(self.tick + 1, organism.id, organism.size, organism.pos[0], organism.pos[1])
+
+	def spawnPlants(self):
+		'''
+		Generates new plants to sustain the organisms.
+		'''
+		if random.random() < plantSpawnChance:
+			self.addOrganism('plant')
+			self.plantsSpawned += 1
+
+	def endTick(self):
+		'''
+		Removes the organisms that died this tick and moves on
+		to the next tick.
+
+		Return Value: A list of the organisms that died.
+		'''
+		self.dead = compact(self.organisms)
+		self.deaths = len(self.dead)
+		self.tick += 1
+		return self.dead
+
+	def render(self, dead = None):
+		'''
+		Lets the attached viewer (if any) draw the simulation.
+
+		Parameters:
+			dead (optional): The organisms that died this tick.
+							 Defaults to the ones removed by the
+							 last endTick.
+
+		Return Value: none
+		'''
+		if dead == None:
+			dead = self.dead
+		if self.viewer != None:
+			if dead:
+				self.viewer.organismsDied(dead)
+			self.viewer.drawSimulation(self)
+
+	def update(self):
+		'''
+		Advances the simulation by a single game tick and then
+		lets the attached viewer (if any) draw the result.
+
+		Return Value:
+			True if more than one non-plant organism was alive
+			during the tick; else False.
+		'''
+		if self.profiler != None:
+			self.profiler.runTick(self)
+			return self.livingOrganisms > 1
+
+		self.findTargets()
+		self.moveOrganisms()
+
+		# checks for collisions and responds accordingly
+		self.resolveCollisions()
+
+		self.starveOrganisms()
+		self.spawnPlants()
+
+		# the dead are only removed once the tick is over
+		self.endTick()
+		self.render()
+
+		return self.livingOrganisms > 1
+
+def simulationSteps(sim, ticks = None, timeBudget = None, tickTime = None, beforeTick = None):
+	'''
+	The loop behind runSimulation and runSimulationAsync. Each time
+	the generator is advanced it runs one tick and yields the number
+	of seconds to wait before the next one (0 if the simulation is
+	not paced or the tick ran late). The parameters are the same as
+	the ones of runSimulation.
+
+	Return Value: The number of ticks that were run (as the value of
+				  the StopIteration ending the generator).
+	'''
+	start = time.perf_counter()
+	nextTick = start
+	ticksRun = 0
+	while ticks == None or ticksRun < ticks:
+		if timeBudget != None and time.perf_counter() - start >= timeBudget:
+			break
+		if beforeTick != None:
+			beforeTick()
+
+		ticksRun += 1
+		if not sim.update():
+			break
+
+		delay = 0
+		if tickTime and sim.viewer != None:
+			nextTick += tickTime
+			delay = nextTick - time.perf_counter()
+			if delay <= 0:
+				# the tick ran late, so don't try to catch up
+				nextTick = time.perf_counter()
+				delay = 0
+		yield delay
+	return ticksRun
+
+def runSimulation(sim, ticks = None, timeBudget = None, tickTime = None, beforeTick = None):
+	'''
+	Runs a simulation (or a population.population) until only one
+	non-plant organism is left. Every call to update advances the
+	simulation by exactly one game tick no matter how long the
+	tick took, so runs are reproducible whether they are paced or
+	not.
+
+	Parameters:
+		sim: The simulation to run.
+		ticks (optional): The largest number of ticks to run.
+		timeBudget (optional): Stop the run once this many seconds
+							   of wall-clock time have passed. The
+							   budget is checked between ticks.
+		tickTime (optional): The number of seconds each tick
+							 should last in real time. Only used
+							 when a viewer is attached; otherwise
+							 the simulation runs unthrottled.
+		beforeTick (optional): A function called with no arguments
+							   before every tick.
+
+	Return Value: The number of ticks that were run.
+	'''
+	steps = simulationSteps(sim, ticks, timeBudget, tickTime, beforeTick)
+	try:
+		while True:
+			delay = next(steps)
+			if delay > 0:
+				time.sleep(delay)
+	except StopIteration as stop:
+		return stop.value
+
+async def runSimulationAsync(sim, ticks = None, timeBudget = None, tickTime = None, beforeTick = None):
+	'''
+	The asyncio version of runSimulation. Instead of sleeping
+	between ticks the coroutine awaits, and it yields to the event
+	loop after every tick even when it is not paced, so other tasks
+	(drawing, input, other simulations) keep running. The
+	parameters are the same as the ones of runSimulation.
+
+	Return Value: The number of ticks that were run.
+	'''
+	import asyncio
+	steps = simulationSteps(sim, ticks, timeBudget, tickTime, beforeTick)
+	try:
+		while True:
+			await asyncio.sleep(next(steps))
+	except StopIteration as stop:
+		return stop.value
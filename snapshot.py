@@ -0,0 +1,252 @@
+'''
+snapshot.py
+
+Runs a simulation in a worker thread so that drawing it never slows
+it down and a slow tick never freezes the window. After every tick
+the simulation thread publishes an immutable snapshot of the living
+organisms (their positions, sizes and types) into a double buffer,
+and the thread that owns the window draws whichever snapshot is the
+latest (see naturalSelectionSim.runSimThreaded). Anything that has
+to change the simulation, such as spawning an organism where the
+user clicked, is handed to the simulation thread with
+simulationThread.call and run between two ticks.
+'''
+
+import queue
+import threading
+import population
+import raster
+import sim_core
+
+class organismState:
+	'''
+	This class is the state of a single organism in a snapshot.
+	It has the same getters as an organism, so a viewer can draw
+	it like one. States compare equal if they belong to the same
+	organism.
+	'''
+
+	def __init__(self, key, x, y, size, organismType):
+		self.key = key
+		self.pos = (x, y)
+		self.size = size
+		self.type = organismType
+
+	def __eq__(self, other):
+		return isinstance(other, organismState) and self.key == other.key
+
+	def __hash__(self):
+		return hash(self.key)
+
+	def getPos(self):
+		return self.pos
+
+	def getSize(self):
+		return self.size
+
+	def getType(self):
+		return self.type
+
+class simulationSnapshot:
+	'''
+	This class holds the living organisms of a simulation at the
+	end of one tick. Its arrays are read-only copies, so it can be
+	read by another thread while the simulation goes on.
+	'''
+
+	def __init__(self, tick, livingOrganisms, keys, arrays):
+		'''
+		Initializes the snapshot (see takeSnapshot).
+
+		Parameters:
+			tick: The tick the snapshot was taken at.
+			livingOrganisms: The number of living non-plant
+							 organisms.
+			keys: A list of a unique key of every organism.
+			arrays: The arrays (x, y, size, typeCode) of the
+					organisms (see raster.organismArrays). They
+					must not be changed afterwards.
+		'''
+		self.tick = tick
+		self.livingOrganisms = livingOrganisms
+		self.keys = keys
+		self.arrays = arrays
+		for array in self.arrays:
+			array.setflags(write=False)
+		self.states = None
+
+	def __len__(self):
+		return len(self.keys)
+
+	def organismArrays(self):
+		'''
+		Returns the arrays (x, y, size, typeCode) of the organisms,
+		like raster.organismArrays.
+		'''
+		return self.arrays
+
+	def keySet(self):
+		'''
+		Returns a set of the keys of the organisms in the snapshot
+		(their ids).
+		'''
+		return set(self.keys)
+
+	def getOrganisms(self):
+		'''
+		Returns a list of the organismState of every organism in
+		the snapshot.
+		'''
+		if self.states == None:
+			x, y, size, typeCode = self.arrays
+			self.states = [organismState(key, organismX, organismY, organismSize, population.typeNames[code])
+						   for key, organismX, organismY, organismSize, code
+						   in zip(self.keys, x.tolist(), y.tolist(), size.tolist(), typeCode.tolist())]
+		return self.states
+
+def takeSnapshot(sim):
+	'''
+	Takes a snapshot of a simulation (or population). The keys of
+	the organisms are their ids.
+
+	Return Value: A new simulationSnapshot.
+	'''
+	if isinstance(sim, population.population):
+		keys = sim.ids[:sim.count][sim.alive[:sim.count]].tolist()
+	else:
+		keys = [organism.getId() for organism in sim.getOrganisms()]
+	return simulationSnapshot(sim.tick, sim.livingOrganisms, keys, raster.organismArrays(sim))
+
+class snapshotBuffer:
+	'''
+	A double buffer of snapshots. The simulation thread writes the
+	next snapshot into the back slot and then swaps the slots, so
+	a reader always gets a complete snapshot without waiting for a
+	tick to finish.
+	'''
+
+	def __init__(self):
+		self.slots = [None, None]
+		self.front = 0
+		self.sequence = 0
+		self.lock = threading.Lock()
+
+	def publish(self, snapshot):
+		'''
+		Makes a snapshot the latest one.
+		'''
+		self.slots[1 - self.front] = snapshot
+		with self.lock:
+			self.front = 1 - self.front
+			self.sequence += 1
+
+	def latest(self):
+		'''
+		Returns a tuple (sequence, snapshot) of the latest snapshot
+		and the number of snapshots published so far, which tells
+		a reader whether anything changed since its last call.
+		'''
+		with self.lock:
+			return self.sequence, self.slots[self.front]
+
+class snapshotPublisher:
+	'''
+	This class is a viewer (see simulation.attachViewer) that
+	publishes a snapshot of the simulation into a snapshotBuffer
+	after every tick instead of drawing it.
+	'''
+
+	def __init__(self, buffer):
+		self.buffer = buffer
+
+	def organismsDied(self, organisms):
+		'''
+		Nothing to do, since a reader can tell which organisms died
+		by comparing snapshots.
+		'''
+		pass
+
+	def drawSimulation(self, sim):
+		self.buffer.publish(takeSnapshot(sim))
+
+class simulationThread(threading.Thread):
+	'''
+	This class runs a simulation in its own thread, publishing a
+	snapshot after every tick.
+	'''
+
+	def __init__(self, sim, buffer, ticks = None, timeBudget = None, tickTime = None):
+		'''
+		Initializes the thread. The simulation must not be
+		touched by any other thread once the thread is started,
+		except through call.
+
+		Parameters:
+			sim: The simulation (or population) to run.
+			buffer: The snapshotBuffer to publish snapshots into.
+			ticks, timeBudget, tickTime (optional): Passed on to
+				sim_core.simulationSteps; the ticks are paced in
+				real time if tickTime is set.
+		'''
+		threading.Thread.__init__(self, name='simulation', daemon=True)
+		self.sim = sim
+		self.buffer = buffer
+		self.ticks = ticks
+		self.timeBudget = timeBudget
+		self.tickTime = tickTime
+		self.calls = queue.SimpleQueue()
+		self.stopped = threading.Event()
+		self.ticksRun = 0
+		# the exception that ended the simulation, if any
+		self.error = None
+
+	def call(self, function, *arguments):
+		'''
+		Has the simulation thread call a function with the given
+		arguments before its next tick.
+		'''
+		self.calls.put((function, arguments))
+
+	def runCalls(self):
+		'''
+		Calls every function handed over with call so far.
+		'''
+		while True:
+			try:
+				function, arguments = self.calls.get_nowait()
+			except queue.Empty:
+				return
+			function(*arguments)
+
+	def stop(self):
+		'''
+		Stops the simulation after the current tick and waits for
+		the thread to finish.
+		'''
+		self.stopped.set()
+		self.join()
+
+	def raiseError(self):
+		'''
+		Raises the exception that ended the simulation in this
+		thread, if any. Meant to be called after stop (or join).
+		'''
+		if self.error != None:
+			raise self.error
+
+	def run(self):
+		firstTick = self.sim.tick
+		self.sim.attachViewer(snapshotPublisher(self.buffer))
+		try:
+			self.buffer.publish(takeSnapshot(self.sim))
+			steps = sim_core.simulationSteps(self.sim, self.ticks, self.timeBudget, self.tickTime, self.runCalls)
+			for delay in steps:
+				if self.stopped.wait(delay):
+					break
+		except Exception as error:
+			# handed over to the thread that started the simulation
+			# (see raiseError)
+			self.error = error
+		finally:
+			self.ticksRun = self.sim.tick - firstTick
+			self.sim.detachViewer()
@@ -0,0 +1,219 @@
+'''
+sweep.py
+
+Scans the configuration of the simulation (the settings listed in
+sim_core.settingNames) over a grid or a random sample of values,
+runs a number of replicate simulations of every configuration in a
+pool of worker processes and writes one row per run to a CSV table.
+
+Run from the command line, for example:
+
+    python sweep.py --grid windowSize=100,200 --grid speedFactor=.5,1 --replicates 10 --output sweep.csv
+    python sweep.py --random plantSpawnChance=.3:.9 --samples 50 --output sweep.csv
+'''
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import random
+import sys
+import ensemble
+import sim_core
+
+organismTypes = ('plant', 'herbivore', 'omnivore', 'carnivore')
+
+def gridSample(grid):
+	'''
+	Builds every combination of the given setting values.
+
+	Parameters:
+		grid: A dictionary mapping setting names to lists of
+			  values.
+
+	Return Value: A list of settings dictionaries.
+	'''
+	names = list(grid)
+	return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def randomSample(ranges, samples, seed = None):
+	'''
+	Draws random configurations.
+
+	Parameters:
+		ranges: A dictionary mapping setting names to either a
+				(low, high) tuple or a list of choices. Ranges
+				with two integer ends are sampled as integers.
+		samples: The number of configurations to draw.
+		seed (optional): The seed for the random draws.
+
+	Return Value: A list of settings dictionaries.
+	'''
+	rng = random.Random(seed)
+	configurations = []
+	for i in range(samples):
+		settings = {}
+		for name, choices in ranges.items():
+			if isinstance(choices, tuple):
+				low, high = choices
+				if isinstance(low, int) and isinstance(high, int):
+					settings[name] = rng.randint(low, high)
+				else:
+					settings[name] = rng.uniform(low, high)
+			else:
+				settings[name] = rng.choice(choices)
+		configurations.append(settings)
+	return configurations
+
+def runConfiguration(settings, seed, engine = 'object', ticks = None, timeBudget = None):
+	'''
+	Runs a single simulation with the given settings. The
+	previous configuration of the worker is restored afterwards.
+
+	Parameters:
+		settings: A settings dictionary for sim_core.configure.
+		seed: The seed of the run.
+		engine, ticks, timeBudget (optional): Passed on to
+											  ensemble.runOne.
+
+	Return Value: The summary of the run (see ensemble.summarizeRun).
+	'''
+	previous = sim_core.configure(**settings)
+	try:
+		return ensemble.runOne(seed, engine, ticks, timeBudget)
+	finally:
+		sim_core.configure(**previous)
+
+def resultRow(configuration, replicate, settings, result):
+	'''
+	Flattens the summary of a run into a row of the results table.
+	'''
+	row = {'configuration': configuration, 'replicate': replicate, 'seed': result['seed']}
+	row.update(settings)
+	row['ticks'] = result['ticks']
+	for organismType in organismTypes:
+		traits = result['traits'].get(organismType, {})
+		row[organismType + 'Survivors'] = result['survivors'].get(organismType, 0)
+		row[organismType + 'MeanSize'] = traits.get('size', '')
+		row[organismType + 'MeanSpeed'] = traits.get('speed', '')
+	return row
+
+def runSweep(configurations, replicates = 1, workers = None, engine = 'object', ticks = None,
+			 timeBudget = None, output = None, firstSeed = 0):
+	'''
+	Runs every configuration a number of times in a pool of worker
+	processes and yields one row per run in the order the runs
+	finish. The rows are also written to output as a CSV table.
+
+	Parameters:
+		configurations: A list of settings dictionaries (see
+						gridSample and randomSample).
+		replicates (optional): The number of runs of each
+							   configuration.
+		workers (optional): The number of worker processes.
+		engine, ticks, timeBudget (optional): Passed on to
+											  ensemble.runOne.
+		output (optional): A file name or open file to write the
+						   results table to.
+		firstSeed (optional): The seed of the first run. Every
+							  run gets the next seed.
+
+	Return Value: A generator of result rows (dictionaries).
+	'''
+	settingColumns = []
+	for settings in configurations:
+		for name in settings:
+			if name not in sim_core.settingNames:
+				raise ValueError('unknown setting: {}'.format(name))
+			if name not in settingColumns:
+				settingColumns.append(name)
+	columns = ['configuration', 'replicate', 'seed'] + settingColumns + ['ticks']
+	for organismType in organismTypes:
+		columns += [organismType + 'Survivors', organismType + 'MeanSize', organismType + 'MeanSpeed']
+
+	closeOutput = False
+	writer = None
+	if output != None:
+		if isinstance(output, str):
+			output = open(output, 'w', newline='')
+			closeOutput = True
+		writer = csv.DictWriter(output, columns, restval='')
+		writer.writeheader()
+
+	executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+	try:
+		runs = {}
+		seed = firstSeed
+		for configuration, settings in enumerate(configurations):
+			for replicate in range(replicates):
+				future = executor.submit(runConfiguration, settings, seed, engine, ticks, timeBudget)
+				runs[future] = (configuration, replicate, settings)
+				seed += 1
+
+		for future in concurrent.futures.as_completed(runs):
+			configuration, replicate, settings = runs[future]
+			row = resultRow(configuration, replicate, settings, future.result())
+			if writer != None:
+				writer.writerow(row)
+				output.flush()
+			yield row
+	finally:
+		executor.shutdown(cancel_futures=True)
+		if closeOutput:
+			output.close()
+
+def parseValue(text):
+	'''
+	Converts a command line value to an int, float or bool.
+	'''
+	if text in ('True', 'False'):
+		return text == 'True'
+	for convert in (int, float):
+		try:
+			return convert(text)
+		except ValueError:
+			pass
+	raise ValueError('not a number: {}'.format(text))
+
+def main():
+	'''
+	Runs a sweep from the command line.
+	'''
+	parser = argparse.ArgumentParser(description='Sweep the natural selection simulation configuration.')
+	parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2,...',
+						help='values of a setting to combine with every other grid setting')
+	parser.add_argument('--random', action='append', default=[], metavar='NAME=LOW:HIGH',
+						help='range of a setting to sample randomly')
+	parser.add_argument('--samples', type=int, default=10, help='number of random configurations')
+	parser.add_argument('--replicates', type=int, default=1)
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--engine', choices=ensemble.engineNames, default='object')
+	parser.add_argument('--ticks', type=int, default=None)
+	parser.add_argument('--time-budget', type=float, default=None)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--output', default=None, help='CSV file to write (default: standard output)')
+	arguments = parser.parse_args()
+
+	grid = {}
+	for option in arguments.grid:
+		name, values = option.split('=', 1)
+		grid[name] = [parseValue(value) for value in values.split(',')]
+	ranges = {}
+	for option in arguments.random:
+		name, bounds = option.split('=', 1)
+		low, high = bounds.split(':')
+		ranges[name] = (parseValue(low), parseValue(high))
+
+	configurations = gridSample(grid)
+	if ranges:
+		sampled = randomSample(ranges, arguments.samples, arguments.seed)
+		configurations = [dict(gridSettings, **randomSettings)
+						  for gridSettings in configurations for randomSettings in sampled]
+
+	output = arguments.output if arguments.output != None else sys.stdout
+	for row in runSweep(configurations, arguments.replicates, arguments.workers, arguments.engine,
+						arguments.ticks, arguments.time_budget, output, arguments.seed):
+		pass
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,255 @@
+'''
+telemetry.py
+
+Streams per-tick statistics of a simulation to a JSON lines or CSV
+file. Every tick is summarized by tickAggregates (the population of
+each type, kills, starvations, plants spawned and deaths, and the
+mean and variance of the size and speed of each type). A
+telemetrySink writes the summaries from a background thread in
+batches; the tick loop only hands them over through a bounded
+queue and never waits longer than the sink's budget for room in it.
+Summaries that do not fit in time are dropped and counted instead.
+
+    sink = telemetrySink('run.jsonl')
+    tickProfiler.addHook('after', 'draw', sink.hook)
+
+Run from the command line, for example:
+
+    python telemetry.py --engine population --ticks 500 --output run.csv
+'''
+
+import argparse
+import csv
+import io
+import json
+import queue
+import threading
+import numpy
+import ensemble
+import population
+import sim_core
+
+counterNames = ('kills', 'starvations', 'plantsSpawned', 'deaths')
+traitColumns = ('Count', 'MeanSize', 'SizeVariance', 'MeanSpeed', 'SpeedVariance')
+
+# the columns of a tick summary, in order
+columns = (('tick',) + counterNames +
+		   tuple(organismType + column for organismType in population.typeNames for column in traitColumns))
+
+def traitArrays(sim):
+	'''
+	Collects the sizes, speeds and type codes of the living
+	organisms of a simulation or a population.
+
+	Return Value: A tuple (size, speed, typeCode) of arrays.
+	'''
+	if isinstance(sim, population.population):
+		living = numpy.flatnonzero(sim.alive[:sim.count])
+		return sim.size[living], sim.speed[living], sim.typeCode[living]
+
+	organisms = sim.getOrganisms()
+	size = numpy.fromiter((organism.getSize() for organism in organisms), numpy.float64, len(organisms))
+	speed = numpy.fromiter((organism.getSpeed() for organism in organisms), numpy.float64, len(organisms))
+	typeCode = numpy.fromiter((population.typeCodes[organism.getType()] for organism in organisms), numpy.int8, len(organisms))
+	return size, speed, typeCode
+
+def tickAggregates(sim):
+	'''
+	Summarizes the tick a simulation (or population) just finished.
+
+	Return Value:
+		A dictionary with a value for every name in columns. The
+		means and variances of types without living organisms are
+		None.
+	'''
+	row = {'tick': sim.tick}
+	for name in counterNames:
+		row[name] = getattr(sim, name)
+
+	size, speed, typeCode = traitArrays(sim)
+	types = len(population.typeNames)
+	counts = numpy.bincount(typeCode, minlength=types)
+	for trait, values in (('Size', size), ('Speed', speed)):
+		sums = numpy.bincount(typeCode, weights=values, minlength=types)
+		squares = numpy.bincount(typeCode, weights=values * values, minlength=types)
+		for code, organismType in enumerate(population.typeNames):
+			if counts[code]:
+				mean = sums[code] / counts[code]
+				row[organismType + 'Mean' + trait] = float(mean)
+				row[organismType + trait + 'Variance'] = float(max(squares[code] / counts[code] - mean * mean, 0))
+			else:
+				row[organismType + 'Mean' + trait] = None
+				row[organismType + trait + 'Variance'] = None
+	for code, organismType in enumerate(population.typeNames):
+		row[organismType + 'Count'] = int(counts[code])
+	return {name: row[name] for name in columns}
+
+def telemetryStream(sim, ticks = None, timeBudget = None):
+	'''
+	Runs a simulation unpaced and yields the tickAggregates of
+	every tick as it finishes.
+
+	Parameters:
+		sim: The simulation (or population) to run.
+		ticks, timeBudget (optional): Passed on to
+									  sim_core.simulationSteps.
+
+	Return Value: A generator of tick summaries.
+	'''
+	lastTick = sim.tick
+	for delay in sim_core.simulationSteps(sim, ticks, timeBudget):
+		lastTick = sim.tick
+		yield tickAggregates(sim)
+	if sim.tick != lastTick:
+		# the tick that ended the simulation
+		yield tickAggregates(sim)
+
+class telemetrySink:
+	'''
+	This class writes tick summaries to a file from a background
+	thread, a batch of lines at a time.
+	'''
+
+	def __init__(self, output, fileFormat = None, queueSize = 1024, batchSize = 64, budget = .001):
+		'''
+		Opens the output and starts the writer thread.
+
+		Parameters:
+			output: A file name or an open text file.
+			fileFormat (optional): 'jsonl' or 'csv'. Defaults to
+								   the extension of the file name,
+								   or 'jsonl'.
+			queueSize (optional): The most summaries waiting to be
+								  written.
+			batchSize (optional): The most summaries written with
+								  a single write.
+			budget (optional): The longest record waits for room
+							   in a full queue, in seconds, before
+							   dropping the summary.
+		'''
+		self.closeOutput = isinstance(output, str)
+		if fileFormat == None:
+			fileFormat = 'csv' if self.closeOutput and output.lower().endswith('.csv') else 'jsonl'
+		if fileFormat not in ('jsonl', 'csv'):
+			raise ValueError('unknown telemetry format: {}'.format(fileFormat))
+		if self.closeOutput:
+			output = open(output, 'w', newline='')
+		self.output = output
+		self.fileFormat = fileFormat
+		self.batchSize = batchSize
+		self.budget = budget
+		self.queue = queue.Queue(queueSize)
+		self.recorded = 0
+		self.dropped = 0
+		self.written = 0
+		self.closed = False
+
+		if fileFormat == 'csv':
+			header = io.StringIO()
+			csv.writer(header).writerow(columns)
+			self.output.write(header.getvalue())
+		self.thread = threading.Thread(target=self.writeLoop, name='telemetry', daemon=True)
+		self.thread.start()
+
+	def record(self, row):
+		'''
+		Hands a summary over to the writer thread, waiting at most
+		budget seconds for room in the queue.
+
+		Return Value: True if the summary was queued, False if it
+					  was dropped.
+		'''
+		try:
+			if self.budget:
+				self.queue.put(row, timeout=self.budget)
+			else:
+				self.queue.put_nowait(row)
+		except queue.Full:
+			self.dropped += 1
+			return False
+		self.recorded += 1
+		return True
+
+	def recordTick(self, sim):
+		'''
+		Records the tickAggregates of a simulation.
+		'''
+		return self.record(tickAggregates(sim))
+
+	def hook(self, sim, phase, seconds):
+		'''
+		Records the current tick. Meant to be registered with
+		tickProfiler.addHook after the last phase of a tick.
+		'''
+		self.recordTick(sim)
+
+	def formatBatch(self, rows):
+		'''
+		Formats summaries as lines of the output format.
+		'''
+		if self.fileFormat == 'jsonl':
+			return ''.join(json.dumps(row) + '\n' for row in rows)
+		text = io.StringIO()
+		csv.DictWriter(text, columns, restval='').writerows(rows)
+		return text.getvalue()
+
+	def writeLoop(self):
+		'''
+		Writes batches of queued summaries until close is called.
+		'''
+		running = True
+		while running:
+			rows = [self.queue.get()]
+			while len(rows) < self.batchSize:
+				try:
+					rows.append(self.queue.get_nowait())
+				except queue.Empty:
+					break
+			if None in rows:
+				rows = rows[:rows.index(None)]
+				running = False
+			if rows:
+				self.output.write(self.formatBatch(rows))
+				self.output.flush()
+				self.written += len(rows)
+
+	def close(self):
+		'''
+		Writes every queued summary, stops the writer thread and
+		closes the output if the sink opened it.
+		'''
+		if self.closed:
+			return
+		self.closed = True
+		self.queue.put(None)
+		self.thread.join()
+		if self.closeOutput:
+			self.output.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+
+def main():
+	'''
+	Runs a headless simulation from the command line and writes
+	its telemetry.
+	'''
+	parser = argparse.ArgumentParser(description='Record per-tick statistics of a natural selection simulation.')
+	parser.add_argument('--engine', choices=ensemble.engineNames, default='object')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--ticks', type=int, default=None, help='largest number of ticks (default: sim_core.gameTicks)')
+	parser.add_argument('--output', default='telemetry.jsonl', help='.jsonl or .csv file to write')
+	parser.add_argument('--budget', type=float, default=.001, help='seconds a tick may wait for the writer')
+	arguments = parser.parse_args()
+
+	sim = ensemble.newSimulation(arguments.engine, arguments.seed)
+	with telemetrySink(arguments.output, budget=arguments.budget) as sink:
+		for row in telemetryStream(sim, ensemble.tickLimit(arguments.ticks)):
+			sink.record(row)
+	print('{} ticks written to {}, {} dropped'.format(sink.written, arguments.output, sink.dropped))
+
+if __name__ == '__main__':
+	main()